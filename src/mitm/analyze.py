@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Analyse many recorded sessions in parallel. Every capture is split in shards of some minutes of traffic which are parsed
+in a pool of processes, every worker returns the statistics of its shard and writes the timeline of the entities in its
+own file, so the results are merged while the shards are finished and the records are never held in memory. At the end
+the timelines of the shards are merged in one file in the order of the time.
+
+Usage: python3 analyze.py captures/*.cap --out analysis --workers 8
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from hashlib import sha1
+from heapq import merge
+from json import dumps, loads
+from os import cpu_count, makedirs, path, rmdir, unlink
+
+from core.capture import Recording
+
+TIMELINE = ('init', 'health', 'action', 'character_event', 'character_position', 'my_position', 'client_position')
+
+
+def analyze(filename: str, first: int, end: int, directory: str) -> dict:
+    """
+    Parse one shard of a capture. It runs in a worker process.
+
+    :type filename: str
+    :param filename: Path of the capture.
+
+    :type first: int
+    :param first: Offset of the first record of the shard.
+
+    :type end: int
+    :param end: Offset where the shard ends.
+
+    :type directory: str
+    :param directory: The folder of the timelines of the shards.
+
+    :rtype: dict
+    :return: The statistics of the shard.
+    """
+    import core.parser
+
+    records = size = errors = 0
+    opcodes, opcode_bytes, events, unknown, unknown_bytes = Counter(), Counter(), Counter(), Counter(), Counter()
+    samples = []
+    # The captures of different folders could have the same name
+    name = f'{sha1(path.abspath(filename).encode("UTF-8")).hexdigest()[:8]}-{path.splitext(path.basename(filename))[0]}'
+    timeline = path.join(directory, f'{name}-{first:012}.jsonl')
+    recording = Recording(filename)
+    with open(timeline, 'w') as file:
+        for timestamp, port, is_server, data in recording.records(offset=first, stop=end):
+            records += 1
+            size += len(data)
+            direction = 'server' if is_server else 'client'
+            parse = core.parser.Parse(data, live=False)
+            parse.time = timestamp
+            try:
+                if is_server:
+                    parse.server(port)
+                else:
+                    parse.client(port)
+            except Exception as e:
+                errors += 1
+                if len(samples) < 10:
+                    samples.append({'time': timestamp, 'port': port, 'direction': direction, 'error': str(e),
+                                    'data': data[:64].hex()})
+
+            for packet_id, length in parse.opcodes:
+                key = f'{direction}:{packet_id:04x}'
+                opcodes[key] += 1
+                opcode_bytes[key] += length
+            for region, length in parse.unknown:
+                key = f'{direction}:{region[:8].hex()}'
+                unknown[key] += 1
+                unknown_bytes[key] += length
+            for name, fields in parse.events:
+                events[name] += 1
+                if name in TIMELINE:
+                    file.write(dumps({'time': timestamp, 'port': port, 'event': name, 'values': fields}) + '\n')
+    recording.close()
+    return {'file': filename, 'records': records, 'bytes': size, 'errors': errors, 'samples': samples,
+            'opcodes': opcodes, 'opcode_bytes': opcode_bytes, 'events': events, 'unknown': unknown,
+            'unknown_bytes': unknown_bytes, 'timeline': timeline}
+
+
+def merge_timelines(timelines: list, filename: str) -> int:
+    """
+    Merge the timelines of the shards in the order of the time. Every timeline is already sorted, so they are read in
+    parallel and only one line of every shard is held in memory. The timelines of the shards are removed.
+
+    :type timelines: list
+    :param timelines: Paths of the timelines of the shards.
+
+    :type filename: str
+    :param filename: Path of the merged timeline.
+
+    :rtype: int
+    :return: The number of events of the timeline.
+    """
+    events = 0
+    with ExitStack() as stack, open(filename, 'w') as output:
+        files = [stack.enter_context(open(timeline)) for timeline in timelines]
+        for line in merge(*files, key=lambda value: loads(value)['time']):
+            output.write(line)
+            events += 1
+    for timeline in timelines:
+        unlink(timeline)
+    return events
+
+
+def main() -> None:
+    """
+    Main function which shard the captures, run the workers and merge their results.
+
+    :rtype: None
+    """
+    arguments = ArgumentParser(description='Analyse the recorded sessions of the proxy in parallel.')
+    arguments.add_argument('captures', nargs='+', help='Paths of the captures.')
+    arguments.add_argument('--out', default='./analysis', help='The folder of the summary and the timeline.')
+    arguments.add_argument('--workers', type=int, default=cpu_count(), help='Number of processes.')
+    arguments.add_argument('--shard', type=float, default=600.0, help='Seconds of traffic of every shard.')
+    arguments.add_argument('--top', type=int, default=20, help='Number of unknown regions in the summary.')
+    options = arguments.parse_args()
+
+    directory = path.join(options.out, 'shards')
+    makedirs(directory, exist_ok=True)
+    shards = []
+    for filename in options.captures:
+        recording = Recording(filename)
+        shards.extend((filename, first, end) for first, end in recording.shards(options.shard))
+        recording.close()
+    print(f'Analyse: {len(options.captures)} captures in {len(shards)} shards with {options.workers} workers')
+
+    total = Counter()
+    opcodes, opcode_bytes, events, unknown, unknown_bytes = Counter(), Counter(), Counter(), Counter(), Counter()
+    samples = []
+    timelines = []
+    with ProcessPoolExecutor(options.workers) as executor:
+        futures = [executor.submit(analyze, filename, first, end, directory) for filename, first, end in shards]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            total.update(records=result['records'], bytes=result['bytes'], errors=result['errors'])
+            opcodes.update(result['opcodes'])
+            opcode_bytes.update(result['opcode_bytes'])
+            events.update(result['events'])
+            unknown.update(result['unknown'])
+            unknown_bytes.update(result['unknown_bytes'])
+            samples.extend(result['samples'][:max(10 - len(samples), 0)])
+            timelines.append(result['timeline'])
+            print(f'| Shard {done:>5}/{len(shards)} | {result["file"]} | Records {result["records"]:>9} | '
+                  f'Errors {result["errors"]:>6} |')
+
+    timeline = path.join(options.out, 'timeline.jsonl')
+    timeline_events = merge_timelines(timelines, timeline)
+    try:
+        rmdir(directory)
+    except OSError:
+        pass
+
+    summary = {
+        'captures': options.captures,
+        'shards': len(shards),
+        'records': total['records'],
+        'bytes': total['bytes'],
+        'errors': total['errors'],
+        'error_samples': samples,
+        'opcodes': {key: {'count': count, 'bytes': opcode_bytes[key]} for key, count in opcodes.most_common()},
+        'events': dict(events.most_common()),
+        'unknown': {key: {'count': count, 'bytes': unknown_bytes[key]}
+                    for key, count in unknown.most_common(options.top)},
+        'unknown_regions': sum(unknown.values()),
+        'unknown_bytes': sum(unknown_bytes.values()),
+        'timeline_events': timeline_events,
+    }
+    with open(path.join(options.out, 'summary.json'), 'w') as file:
+        file.write(dumps(summary, indent=2))
+
+    print(f'Records {total["records"]} | Bytes {total["bytes"]} | Errors {total["errors"]} | '
+          f'Unknown regions {summary["unknown_regions"]} ({summary["unknown_bytes"]} bytes)')
+    for key, values in list(summary['opcodes'].items())[:options.top]:
+        print(f'| {key:>12} | Count {values["count"]:>10} | Bytes {values["bytes"]:>12} |')
+    print(f'Summary: {path.join(options.out, "summary.json")} | Timeline: {timeline} ({timeline_events} events)')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Reusable receive buffer for one connection. The data is received with recv_into in a preallocated memory and returned as
+a memoryview, so the chunks are not allocated and copied every time. The read size grows when the server sends bursts,
+e.g. many spawns on the zone load, and it shrinks again when the traffic is quiet.
+"""
+from socket import socket
+
+
+class Buffer:
+    """
+    Receive the data of a connection in a preallocated memory with an adaptive read size.
+    """
+
+    def __init__(self, size: int = 4096, maximum: int = 262144, shrink_after: int = 64) -> None:
+        """
+        Constructor which init the class.
+
+        :type size: int
+        :param size: Initial and minimum read size in bytes.
+
+        :type maximum: int
+        :param maximum: Maximum read size in bytes, zero means without limit.
+
+        :type shrink_after: int
+        :param shrink_after: Number of consecutive small reads before the read size is reduced.
+
+        :rtype: Buffer
+        :return: The object instanced of this class.
+        """
+        self.minimum = size
+        self.maximum = maximum
+        self.shrink_after = shrink_after
+        self.size = size
+        self._small_reads = 0
+        self._memory = bytearray(size)
+        self._view = memoryview(self._memory)
+
+    @property
+    def capacity(self) -> int:
+        """
+        Bytes allocated by the buffer.
+
+        :rtype: int
+        :return: The size of the preallocated memory.
+        """
+        return len(self._memory)
+
+    def receive(self, source: socket) -> memoryview:
+        """
+        Receive the next chunk of data. The returned view is valid until the next call of this method.
+
+        :type source: socket
+        :param source: Object with the source connection.
+
+        :rtype: memoryview
+        :return: The received data, empty when the connection is closed or reset.
+        """
+        try:
+            size = source.recv_into(self._view, self.size)
+        except OSError:
+            # A reset, e.g. ECONNRESET, ends the connection like a normal close
+            return self._view[:0]
+        data = self._view[:size]
+        self._adapt(size)
+        return data
+
+    def _adapt(self, size: int) -> None:
+        """
+        Double the read size when the buffer was filled and halve it after many small reads.
+
+        :type size: int
+        :param size: Number of bytes of the last read.
+
+        :rtype: None
+        """
+        if size == self.size and (not self.maximum or self.size < self.maximum):
+            self.size = min(self.size * 2, self.maximum) if self.maximum else self.size * 2
+            self._small_reads = 0
+            if self.size > len(self._memory):
+                self._memory = bytearray(self.size)
+                self._view = memoryview(self._memory)
+        elif size < self.size // 4 and self.size > self.minimum:
+            self._small_reads += 1
+            if self._small_reads >= self.shrink_after:
+                self.size = max(self.size // 2, self.minimum)
+                self._small_reads = 0
+        else:
+            self._small_reads = 0
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Record the traffic of the proxy and seek to any moment of the recorded session. Next to the capture there is a sparse
+index of time and offset and periodic snapshots of the world (entities, inventory and health). The world at any time is
+the nearest previous snapshot plus the replay of the tail through the parser. The files are memory-mapped, so a capture
+of many hours opens instantly.
+
+Capture file: a header and the records (time, port, direction, length and the raw data).
+Index file: entries of time and offset of the record in the capture.
+Snapshot file: entries of time, offset of the next record in the capture, length and the world in JSON.
+"""
+from bisect import bisect_right
+from json import dumps, loads
+from mmap import mmap, ACCESS_READ
+from os import path
+from queue import SimpleQueue
+from struct import Struct
+from threading import Thread, Lock
+
+from core.world import World
+
+HEADER = b'PWN3CAP1'
+RECORD = Struct('<dHBI')
+INDEX = Struct('<dQ')
+SNAPSHOT = Struct('<dQI')
+
+
+class Capture:
+    """
+    Write the traffic, the index and the snapshots of the world.
+    """
+    ACTIVE = None
+
+    def __init__(self, filename: str, index_interval: float = 1.0, snapshot_interval: float = 60.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type filename: str
+        :param filename: Path of the capture, the index and the snapshots use the same name with .idx and .snap.
+
+        :type index_interval: float
+        :param index_interval: Seconds between the entries of the index.
+
+        :type snapshot_interval: float
+        :param snapshot_interval: Seconds between the snapshots of the world.
+
+        :rtype: Capture
+        :return: The object instanced of this class.
+        """
+        self.filename = filename
+        self.index_interval = index_interval
+        self.snapshot_interval = snapshot_interval
+        self.world = World()
+        self.records = 0
+        self.snapshots = 0
+        self._offset = len(HEADER)
+        self._next_index = 0.0
+        self._next_snapshot = 0.0
+        self._lock = Lock()
+        self._capture = open(filename, 'wb')
+        self._capture.write(HEADER)
+        self._index = open(f'{filename}.idx', 'wb')
+        self._snapshot = open(f'{filename}.snap', 'wb')
+        self._snapshots = SimpleQueue()
+        self._writer = Thread(target=self._write_snapshots, name='Capture', daemon=True)
+        self._writer.start()
+
+    def add(self, port: int, is_server: bool, timestamp: float, data: bytes, events: list) -> None:
+        """
+        Write the data of one package and update the world with its events.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type is_server: bool
+        :param is_server: True if the data comes from the server.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type data: bytes
+        :param data: Raw data which was parsed.
+
+        :type events: list
+        :param events: The name and the values of every event of the package.
+
+        :rtype: None
+        """
+        with self._lock:
+            if self._capture.closed:
+                return
+            if timestamp >= self._next_snapshot:
+                self._write_snapshot(timestamp)
+            if timestamp >= self._next_index:
+                self._index.write(INDEX.pack(timestamp, self._offset))
+                self._next_index = timestamp + self.index_interval
+
+            self._capture.write(RECORD.pack(timestamp, port, int(is_server), len(data)))
+            self._capture.write(data)
+            self._offset += RECORD.size + len(data)
+            self.records += 1
+            self.world.apply(port, timestamp, events)
+
+    def positions(self, port: int, actors: list, times: list, x: list, y: list, z: list) -> None:
+        """
+        Update the world with a decoded window of positions, the parser does not send them as events.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type actors: list
+        :param actors: The ID of the actor of every position, zero for your player.
+
+        :type times: list
+        :param times: The time of every position.
+
+        :type x: list
+        :param x: Positions in the axis X.
+
+        :type y: list
+        :param y: Positions in the axis Y.
+
+        :type z: list
+        :param z: Positions in the axis Z.
+
+        :rtype: None
+        """
+        with self._lock:
+            if self._capture.closed:
+                return
+            for actor, timestamp, *position in zip(actors, times, x, y, z):
+                self.world.move(port, actor, timestamp, *position)
+
+    def close(self) -> None:
+        """
+        Flush and close the files. The snapshots which are waiting are written first.
+
+        :rtype: None
+        """
+        with self._lock:
+            if self._capture.closed:
+                return
+            self._capture.close()
+            self._index.close()
+        self._snapshots.put(None)
+        self._writer.join()
+        self._snapshot.close()
+
+    def stats(self) -> dict:
+        """
+        Describe the capture for the control API.
+
+        :rtype: dict
+        :return: The file, the records, the size and the snapshots.
+        """
+        return {'filename': self.filename, 'records': self.records, 'bytes': self._offset,
+                'snapshots': self.snapshots}
+
+    def _write_snapshot(self, timestamp: float) -> None:
+        """
+        Save the world before the next record. Only the copy of the world is taken here, it is serialized in the
+        background, so the relay thread is not blocked. The lock must be taken.
+
+        :type timestamp: float
+        :param timestamp: The time of the next record.
+
+        :rtype: None
+        """
+        self._snapshots.put((timestamp, self._offset, self.world.snapshot()))
+        self._next_snapshot = timestamp + self.snapshot_interval
+        self.snapshots += 1
+
+    def _write_snapshots(self) -> None:
+        """
+        Serialize and write the snapshots in the order they were taken until the capture is closed.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while True:
+            snapshot = self._snapshots.get()
+            if snapshot is None:
+                return
+            timestamp, offset, world = snapshot
+            payload = dumps(world).encode('UTF-8')
+            self._snapshot.write(SNAPSHOT.pack(timestamp, offset, len(payload)))
+            self._snapshot.write(payload)
+
+
+class Recording:
+    """
+    Read a capture and restore the world at any time.
+    """
+
+    def __init__(self, filename: str) -> None:
+        """
+        Constructor which init the class. The capture is memory-mapped and only the index is loaded.
+
+        :type filename: str
+        :param filename: Path of the capture.
+
+        :rtype: Recording
+        :return: The object instanced of this class.
+        """
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self.data = mmap(self._file.fileno(), 0, access=ACCESS_READ)
+        if self.data[:len(HEADER)] != HEADER:
+            raise ValueError(f'{filename} is not a capture')
+
+        self.index_times, self.index_offsets = self._load_index(f'{filename}.idx')
+        self.snapshot_times, self.snapshot_entries = [], []
+        self.snapshots = None
+        if path.exists(f'{filename}.snap') and path.getsize(f'{filename}.snap') > 0:
+            with open(f'{filename}.snap', 'rb') as file:
+                self.snapshots = mmap(file.fileno(), 0, access=ACCESS_READ)
+            self._load_snapshots()
+
+    @staticmethod
+    def _load_index(filename: str) -> tuple:
+        """
+        Read the sparse index.
+
+        :type filename: str
+        :param filename: Path of the index.
+
+        :rtype: tuple
+        :return: The list of times and the list of offsets.
+        """
+        times, offsets = [], []
+        if path.exists(filename):
+            with open(filename, 'rb') as file:
+                content = file.read()
+            usable = len(content) - len(content) % INDEX.size
+            for timestamp, offset in INDEX.iter_unpack(content[:usable]):
+                times.append(timestamp)
+                offsets.append(offset)
+        return times, offsets
+
+    def _load_snapshots(self) -> None:
+        """
+        Read the headers of the snapshots, the worlds are only decoded when they are restored.
+
+        :rtype: None
+        """
+        position = 0
+        while position + SNAPSHOT.size <= len(self.snapshots):
+            timestamp, offset, length = SNAPSHOT.unpack_from(self.snapshots, position)
+            if position + SNAPSHOT.size + length > len(self.snapshots):
+                break
+            self.snapshot_times.append(timestamp)
+            self.snapshot_entries.append((offset, position + SNAPSHOT.size, length))
+            position += SNAPSHOT.size + length
+
+    def close(self) -> None:
+        """
+        Close the memory maps and the files.
+
+        :rtype: None
+        """
+        self.data.close()
+        self._file.close()
+        if self.snapshots is not None:
+            self.snapshots.close()
+
+    def records(self, start: float = None, end: float = None, offset: int = None, stop: int = None) -> iter:
+        """
+        Iterate over the records between two times. The first record is found with the sparse index.
+
+        :type start: float
+        :param start: Time of the first record, None from the beginning.
+
+        :type end: float
+        :param end: Time of the last record, None until the end.
+
+        :type offset: int
+        :param offset: Offset of the first record in the capture, it has priority over the start.
+
+        :type stop: int
+        :param stop: Offset where the records end, None until the end of the capture.
+
+        :rtype: iter
+        :return: The time, port, True if it comes from the server and the data of every record.
+        """
+        if offset is None:
+            offset = len(HEADER)
+            if start is not None:
+                idx = bisect_right(self.index_times, start) - 1
+                if idx >= 0:
+                    offset = self.index_offsets[idx]
+
+        size = len(self.data) if stop is None else min(stop, len(self.data))
+        while offset + RECORD.size <= size:
+            timestamp, port, is_server, length = RECORD.unpack_from(self.data, offset)
+            offset += RECORD.size
+            if offset + length > size:
+                break
+            if end is not None and timestamp > end:
+                break
+            if start is None or timestamp >= start:
+                yield timestamp, port, bool(is_server), self.data[offset:offset + length]
+            offset += length
+
+    def shards(self, seconds: float) -> list:
+        """
+        Split the capture in ranges of records which are analysed independently. The limits are taken from the index.
+
+        :type seconds: float
+        :param seconds: Approximate time of the traffic of every range.
+
+        :rtype: list
+        :return: The first and the end offset of every range.
+        """
+        limits = [len(HEADER)]
+        following = (self.index_times[0] if self.index_times else 0.0) + seconds
+        for timestamp, offset in zip(self.index_times, self.index_offsets):
+            if timestamp >= following and offset > limits[-1]:
+                limits.append(offset)
+                following = timestamp + seconds
+        limits.append(len(self.data))
+        return [(first, end) for first, end in zip(limits, limits[1:]) if end > first]
+
+    def world_at(self, timestamp: float) -> World:
+        """
+        Restore the world at the time: the nearest previous snapshot plus the replay of the tail through the parser.
+
+        :type timestamp: float
+        :param timestamp: The time of the world.
+
+        :rtype: World
+        :return: The state of the world.
+        """
+        import core.parser
+
+        idx = bisect_right(self.snapshot_times, timestamp) - 1
+        if idx >= 0:
+            offset, position, length = self.snapshot_entries[idx]
+            world = World.restore(loads(bytes(self.snapshots[position:position + length])))
+        else:
+            offset = len(HEADER)
+            world = World()
+
+        for record_time, port, is_server, data in self.records(end=timestamp, offset=offset):
+            parse = core.parser.Parse(data, live=False)
+            parse.time = record_time
+            try:
+                if is_server:
+                    parse.server(port)
+                else:
+                    parse.client(port)
+            except Exception:
+                pass
+            world.apply(port, record_time, parse.events)
+        return world
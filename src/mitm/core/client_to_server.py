@@ -6,7 +6,7 @@ Manage the connection from the Client to the Server.
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR
+from socket import socket
 from threading import Thread
 
 from core.package import Package
@@ -17,12 +17,12 @@ class ClientToServer(Thread):
     Get, analyze and modify the data from client and send to the server.
     """
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, client: socket, port: int) -> None:
         """
         Constructor which init the class.
 
-        :type host: str
-        :param host: The client's IP.
+        :type client: socket
+        :param client: The connection accepted from the client.
 
         :type port: int
         :param port: The number of the port for the communication.
@@ -36,12 +36,8 @@ class ClientToServer(Thread):
         self.server = None
         self.port = port
         self.package = None
-        sock = socket(AF_INET, SOCK_STREAM)
-        sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
-        sock.bind((host, port))
-        sock.listen(1)
-        # Waiting for a connection
-        self.client, addr = sock.accept()
+        self.session = None
+        self.client = client
 
     def terminate(self) -> None:
         """
@@ -49,7 +45,8 @@ class ClientToServer(Thread):
 
         :rtype: None
         """
-        self.package.terminate()
+        if self.package is not None:
+            self.package.terminate()
 
     def run(self) -> None:
         """
@@ -58,5 +55,9 @@ class ClientToServer(Thread):
 
         :rtype: None
         """
-        self.package = Package(False, self.client, self.server, self.port)
-        self.package.start()
+        try:
+            self.package = Package(False, self.client, self.server, self.port)
+            self.package.start()
+        finally:
+            if self.session is not None:
+                self.session.finished()
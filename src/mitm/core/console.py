@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Interactive console of the proxy. It is only a client of the control API, so the proxy does not depend on the prompt and
+the same commands could be sent by scripts.
+"""
+from itertools import count
+from json import dumps, loads
+from shlex import split
+from socket import socket, AF_UNIX, SOCK_STREAM
+
+
+class Console:
+    """
+    Read the commands from the prompt and send them to the control API.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type socket_path: str
+        :param socket_path: The path of the Unix socket of the control API.
+
+        :rtype: Console
+        :return: The object instanced of this class.
+        """
+        self.socket_path = socket_path
+        self._ids = count(1)
+        self._connection = socket(AF_UNIX, SOCK_STREAM)
+        self._connection.connect(socket_path)
+        self._stream = self._connection.makefile('rwb')
+
+    def request(self, method: str, **params) -> object:
+        """
+        Call a method of the control API.
+
+        :type method: str
+        :param method: Name of the method.
+
+        :type params: dict
+        :param params: Named parameters of the method.
+
+        :rtype: object
+        :return: The result of the method.
+        """
+        message = {'jsonrpc': '2.0', 'id': next(self._ids), 'method': method, 'params': params}
+        self._stream.write(dumps(message).encode('UTF-8') + b'\n')
+        self._stream.flush()
+        response = loads(self._stream.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error']['message'])
+        return response['result']
+
+    def run(self) -> None:
+        """
+        Read the commands until the proxy is stopped.
+
+        :rtype: None
+        """
+        while True:
+            try:
+                cmd = input('>>> ').lower()
+                if not cmd:
+                    continue
+                if self.execute(cmd):
+                    break
+            except (EOFError, KeyboardInterrupt):
+                self.request('shutdown')
+                break
+            except Exception as e:
+                print(f'ERROR: Input section ---> {e}')
+
+    def execute(self, cmd: str) -> bool:
+        """
+        Translate the command of the prompt to the control API and print the result.
+
+        :type cmd: str
+        :param cmd: The command of the prompt.
+
+        :rtype: bool
+        :return: True if the proxy was stopped.
+        """
+        words = split(cmd)
+        name, arguments = words[0], words[1:]
+        options = self._options(arguments)
+
+        if name == 'hello':
+            print(self.request('hello'))
+        elif name in ('quit', 'q', 'exit'):
+            self.request('shutdown')
+            return True
+        elif name in ('t', 'thread', 'threads'):
+            for thread in self.request('threads'):
+                print(f'| {thread["name"]:>25} | PID {thread["pid"]} | ID {thread["id"]} | '
+                      f'Alive {thread["alive"]} | Daemon {thread["daemon"]} |')
+        elif name in ('ss', 'session', 'sessions'):
+            for session in self.request('sessions'):
+                print(f'| Session #{session["session"]:<4} | Port {session["port"]:>5} | {session["host"]:>20} | '
+                      f'{session["started"]} |')
+        elif name in ('r', 'route', 'routes'):
+            if arguments:
+                host, port = arguments
+                self.request('route', host=host, port=int(port))
+            for route in self.request('routes'):
+                print(f'| Port {route["port"]:>5} | {route["host"]:>20} | Connections {route["connections"]:>3} | '
+                      f'Client {route["client"]} |')
+        elif name in ('pt', 'passthrough'):
+            port = int(arguments[0]) if arguments else None
+            print(f'Pass-through ports: {self.request("passthrough", port=port)}')
+        elif name == 'tcp':
+            params = dict(zip(('port', 'option', 'value'), arguments))
+            for profile in self.request('tcp', **params):
+                print(f'| {profile.pop("port") or "Default":>7} | {profile} |')
+        elif name == 'hck':
+            target = arguments[0]
+            retries = int(arguments[1]) if len(arguments) > 1 and arguments[1][0] != '-' else 5
+            print(f'Hack queued in port {self.request("hack", target=target, retries=retries, **options)}')
+        elif name in ('s', 'c'):
+            destination = 'server' if name == 's' else 'client'
+            packet = ''.join(self._positional(arguments))
+            print(self.request('send', destination=destination, packet=packet, **options))
+        elif name == 'jobs':
+            for job in self.request('jobs'):
+                print(job)
+        elif name == 'export':
+            print(self.request('export', flush=bool(arguments) and arguments[0] == 'flush') or 'Export disabled')
+        elif name in ('cap', 'capture'):
+            print(self.request('capture') or 'Capture disabled')
+        elif name in ('mem', 'memory'):
+            params = dict(zip(('subsystem', 'limit'), arguments))
+            usage = self.request('memory', **params)
+            if not usage:
+                print('Memory watchdog disabled')
+            else:
+                print(f'Resident: {usage["rss"]} bytes | Sessions reaped: {usage["reaped"]}')
+                for subsystem in usage['subsystems']:
+                    print(f'| {subsystem["subsystem"]:>10} | {subsystem["bytes"]:>12} bytes | '
+                          f'Limit {subsystem["limit"] or "-":>10} | Shed {subsystem["shed"]:>10} |')
+                for session in usage['sessions']:
+                    print(f'| Session #{session["session"]:<4} | Port {session["port"]:>5} | '
+                          f'{session["bytes"]:>10} bytes | Buffers {session["buffers"]} | Queued {session["queued"]} | '
+                          f'Inject {session["inject"]} |')
+        elif name in ('prof', 'profile'):
+            params = {'action': arguments[0]} if arguments else {}
+            if len(arguments) > 1:
+                if params['action'] == 'start':
+                    params['interval'] = float(arguments[1]) / 1000
+                else:
+                    params['directory'] = arguments[1]
+            profile = self.request('profile', **params)
+            if not profile:
+                print('Profiler not started')
+            else:
+                print(f'Profiler running: {profile["running"]} | Interval {profile["interval"] * 1000:.1f} ms | '
+                      f'Samples {profile["samples"]}')
+                for port in profile['ports']:
+                    hottest = ' | '.join(f'{function} {samples}' for function, samples in port['top'])
+                    print(f'| Port {port["port"]:>5} | Samples {port["samples"]:>8} | {hottest} |')
+                for filename in profile.get('files', []):
+                    print(f'Written: {filename}')
+        elif name in ('str', 'strings'):
+            cache = self.request('strings')
+            print(f'Names cached: {cache["size"]}/{cache["limit"]} | Hits {cache["hits"]} | Misses {cache["misses"]} | '
+                  f'Hit rate {cache["rate"]:.1%}')
+        elif name in ('pace', 'pacing'):
+            params = dict(zip(('name', 'rate', 'burst'), arguments))
+            pacing = self.request('pacing', **params)
+            for cls, (rate, burst) in pacing['rates'].items():
+                print(f'| {cls:>7} | Rate {rate:>6.2f}/s | Burst {burst:>3} | Jitter {pacing["jitter"]:.0%} |')
+            for port in pacing['ports']:
+                print(f'| Port {port["port"]:>5} | Cadence {port["cadence"] * 1000:7.1f} ms | Sent {port["sent"]} | '
+                      f'Deferred {port["deferred"]} | Delay {port["delay"]:.2f} s | Waiting {port["waiting"]} |')
+        elif name in ('pos', 'positions'):
+            for window in self.request('positions', flush=bool(arguments) and arguments[0] == 'flush'):
+                print(f'| Port {window["port"]:>5} | Records {window["records"]:>8} | Windows {window["windows"]:>6} | '
+                      f'Teleports {window["teleports"]:>4} | Pending {window["pending"]:>4} |')
+                for actor in window['actors']:
+                    print(f'| Actor {actor["actor"]:>6} | {actor["x"]:10.2f} X | {actor["y"]:10.2f} Y | '
+                          f'{actor["z"]:10.2f} Z | Speed {actor["speed"]:10.2f} | Teleport {actor["teleport"]} |')
+        elif name in ('pred', 'predict'):
+            params = dict(zip(('port', 'actor'), (int(word) for word in self._positional(arguments))))
+            params.update({key: value for key, value in options.items() if key == 'ahead'})
+            for actor in self.request('predict', **params):
+                print(f'| Actor {actor["actor"]:>6} | {actor["x"]:10.2f} X | {actor["y"]:10.2f} Y | '
+                      f'{actor["z"]:10.2f} Z |')
+        elif name == 'cancel':
+            print(self.request('cancel', job=int(arguments[0])))
+        else:
+            print(f'Unknown command: {name}')
+        return False
+
+    @staticmethod
+    def _positional(arguments: list) -> list:
+        """
+        Get the arguments before the first option.
+
+        :type arguments: list
+        :param arguments: The words of the command after its name.
+
+        :rtype: list
+        :return: The positional arguments.
+        """
+        flags = [idx for idx, word in enumerate(arguments) if word[0] == '-'] + [len(arguments)]
+        return arguments[:flags[0]]
+
+    @staticmethod
+    def _options(arguments: list) -> dict:
+        """
+        Get the target and the schedule from the arguments: -p port, -s session, -n total, -r rate and -t seconds
+        ahead.
+
+        :type arguments: list
+        :param arguments: The words of the command after its name.
+
+        :rtype: dict
+        :return: The named parameters for the control API.
+        """
+        names = {'-p': 'port', '-s': 'session', '-n': 'total', '-r': 'rate', '-t': 'ahead'}
+        options = {}
+        for flag, value in zip(arguments, arguments[1:]):
+            if flag in names:
+                options[names[flag]] = float(value) if flag in ('-r', '-t') else int(value)
+        return options
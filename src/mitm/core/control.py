@@ -0,0 +1,659 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Control plane of the proxy. It is a JSON-RPC 2.0 API in a local Unix socket, one request per line, so the console and
+the scripts of the load tests use the same commands. The commands could target a port or a session and the injections
+could be scheduled in bulk, e.g. send N packages at R packages per second.
+"""
+from itertools import count
+from json import dumps, loads
+from os import path, unlink
+from socket import socket, AF_UNIX, SOCK_STREAM, SHUT_RDWR
+from threading import Thread, Event, enumerate as threading_enumerate
+from time import monotonic, time
+
+from core.capture import Capture
+from core.export import Export
+from core.memory import Memory
+from core.pacing import Pacing
+from core.passthrough import Passthrough
+from core.profiler import Profiler
+from core.queue import Queue
+from core.router import Router
+from core.session import Session
+from core.strings import Strings
+from core.tuning import Tuning
+
+
+class Job(Thread):
+    """
+    Send the same package many times to a session at a fixed rate. The rate of the job is chosen by the operator, so
+    it is not paced like the packages which wait in the queues.
+    """
+    BATCH = 1024
+
+    def __init__(self, idx: int, session: Session, destination: str, packet: bytes, total: int, rate: float) -> None:
+        """
+        Constructor which init the class.
+
+        :type idx: int
+        :param idx: Unique ID of the job.
+
+        :type session: Session
+        :param session: The target connection.
+
+        :type destination: str
+        :param destination: It refers to the network target could be client or server.
+
+        :type packet: bytes
+        :param packet: Raw package.
+
+        :type total: int
+        :param total: Number of packages which will be sent.
+
+        :type rate: float
+        :param rate: Packages per second, zero means as fast as possible.
+
+        :rtype: Job
+        :return: The object instanced of this class.
+        """
+        super(Job, self).__init__()
+        self.name = f'Job #{idx}'
+        self.daemon = True
+        self.idx = idx
+        self.session = session
+        self.destination = destination
+        self.packet = packet
+        self.total = total
+        self.rate = rate
+        self.sent = 0
+        self.error = ''
+        self._cancel = Event()
+
+    def cancel(self) -> None:
+        """
+        Stop sending the packages.
+
+        :rtype: None
+        """
+        self._cancel.set()
+
+    def run(self) -> None:
+        """
+        Send the packages. When the rate is high, all the packages which are due are coalesced in a single write.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        start = monotonic()
+        while self.sent < self.total and not self._cancel.is_set():
+            if self.rate > 0:
+                due = min(int((monotonic() - start) * self.rate) + 1, self.total) - self.sent
+                if due < 1:
+                    self._cancel.wait((self.sent + 1) / self.rate - (monotonic() - start))
+                    continue
+            else:
+                due = self.total - self.sent
+            due = min(due, self.BATCH)
+
+            try:
+                self.session.send(self.destination, self.packet * due)
+            except (OSError, RuntimeError) as e:
+                self.error = str(e)
+                break
+            self.sent += due
+
+    def info(self) -> dict:
+        """
+        Describe the job for the control API.
+
+        :rtype: dict
+        :return: The progress of the job.
+        """
+        return {
+            'job': self.idx,
+            'session': self.session.idx,
+            'destination': self.destination,
+            'sent': self.sent,
+            'total': self.total,
+            'rate': self.rate,
+            'alive': self.is_alive(),
+            'error': self.error,
+        }
+
+
+class Control(Thread):
+    """
+    Serve the JSON-RPC API in a Unix socket.
+    """
+
+    def __init__(self, socket_path: str, router: Router) -> None:
+        """
+        Constructor which init the class.
+
+        :type socket_path: str
+        :param socket_path: The path of the Unix socket.
+
+        :type router: Router
+        :param router: The routing table with the listeners of the proxy.
+
+        :rtype: Control
+        :return: The object instanced of this class.
+        """
+        super(Control, self).__init__()
+        self.name = 'Control'
+        self.daemon = True
+        self.socket_path = socket_path
+        self.router = router
+        self.ready = Event()
+        self.stopped = Event()
+        self.jobs = {}
+        self._jobs = count(1)
+        self._listener = None
+        self.methods = {
+            'hello': self.hello,
+            'threads': self.threads,
+            'sessions': self.sessions,
+            'routes': self.routes,
+            'route': self.route,
+            'passthrough': self.passthrough,
+            'tcp': self.tcp,
+            'hack': self.hack,
+            'send': self.send,
+            'jobs': self.list_jobs,
+            'export': self.export,
+            'capture': self.capture,
+            'memory': self.memory,
+            'profile': self.profile,
+            'strings': self.strings,
+            'pacing': self.pacing,
+            'positions': self.positions,
+            'predict': self.predict,
+            'cancel': self.cancel,
+            'shutdown': self.shutdown,
+        }
+
+    def run(self) -> None:
+        """
+        Accept the clients of the API, everyone is served in a new thread.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        if path.exists(self.socket_path):
+            unlink(self.socket_path)
+        self._listener = socket(AF_UNIX, SOCK_STREAM)
+        self._listener.bind(self.socket_path)
+        self._listener.listen(8)
+        self.ready.set()
+
+        while not self.stopped.is_set():
+            try:
+                connection, addr = self._listener.accept()
+            except OSError:
+                break
+            Thread(target=self._serve, args=(connection,), name='Control client', daemon=True).start()
+
+    def terminate(self) -> None:
+        """
+        Stop the API, cancel the jobs and remove the Unix socket.
+
+        :rtype: None
+        """
+        self.stopped.set()
+        for job in list(self.jobs.values()):
+            job.cancel()
+        if self._listener is not None:
+            try:
+                self._listener.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        if path.exists(self.socket_path):
+            unlink(self.socket_path)
+
+    def call(self, request: bytes) -> dict:
+        """
+        Execute one JSON-RPC request.
+
+        :type request: bytes
+        :param request: The JSON of the request.
+
+        :rtype: dict
+        :return: The JSON-RPC response.
+        """
+        idx = None
+        try:
+            message = loads(request)
+            idx = message.get('id')
+            method = self.methods.get(message.get('method'))
+            if method is None:
+                return {'jsonrpc': '2.0', 'id': idx, 'error': {'code': -32601, 'message': 'Method not found'}}
+            result = method(**message.get('params', {}))
+            return {'jsonrpc': '2.0', 'id': idx, 'result': result}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': idx, 'error': {'code': -32000, 'message': f'{type(e).__name__}: {e}'}}
+
+    def _serve(self, connection: socket) -> None:
+        """
+        Answer the requests of one client until it is disconnected.
+
+        :type connection: socket
+        :param connection: The client of the API.
+
+        :rtype: None
+        """
+        with connection, connection.makefile('rwb') as stream:
+            for line in stream:
+                if not line.strip():
+                    continue
+                stream.write(dumps(self.call(line)).encode('UTF-8') + b'\n')
+                stream.flush()
+
+    @staticmethod
+    def _session(port: int = None, session: int = None) -> Session:
+        """
+        Find the target session. Without port and session it is the last connected client.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type session: int
+        :param session: The ID of the session.
+
+        :rtype: Session
+        :return: The target session, None if there is no session.
+        """
+        if session is not None:
+            return Session.ACTIVE[int(session)]
+        sessions = [item for item in list(Session.ACTIVE.values()) if port is None or item.port == int(port)]
+        return max(sessions, key=lambda item: item.idx) if sessions else None
+
+    @staticmethod
+    def hello() -> str:
+        """
+        Check that the API is alive.
+
+        :rtype: str
+        :return: The greeting.
+        """
+        return 'Hello World!'
+
+    @staticmethod
+    def threads() -> list:
+        """
+        List the threads of the proxy.
+
+        :rtype: list
+        :return: The name, IDs and status of every thread.
+        """
+        return [{'name': thread.name, 'pid': thread.native_id, 'id': thread.ident, 'alive': thread.is_alive(),
+                 'daemon': thread.daemon} for thread in threading_enumerate()]
+
+    @staticmethod
+    def sessions() -> list:
+        """
+        List the clients which are connected.
+
+        :rtype: list
+        :return: The information of every session.
+        """
+        return [session.info() for session in list(Session.ACTIVE.values())]
+
+    def routes(self) -> list:
+        """
+        List the routing table.
+
+        :rtype: list
+        :return: The routes.
+        """
+        return self.router.table()
+
+    def route(self, host: str, port: int) -> list:
+        """
+        Add a route to a game server.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: list
+        :return: The routes.
+        """
+        self.router.add(host, int(port))
+        return self.router.table()
+
+    @staticmethod
+    def passthrough(port: int = None, enabled: bool = None) -> list:
+        """
+        Switch the pass-through mode of the port. Without enabled the mode is toggled.
+
+        :type port: int
+        :param port: The number of the port for the communication, None only lists the ports.
+
+        :type enabled: bool
+        :param enabled: True to relay without inspection.
+
+        :rtype: list
+        :return: The ports in pass-through mode.
+        """
+        if port is not None:
+            port = int(port)
+            if enabled is None:
+                enabled = port not in Passthrough.PORTS
+            if enabled:
+                Passthrough.PORTS.add(port)
+            else:
+                Passthrough.PORTS.discard(port)
+        return sorted(Passthrough.PORTS)
+
+    @staticmethod
+    def tcp(port: int = None, option: str = None, value: str = None) -> list:
+        """
+        Change the socket profile of the port. Without option only lists the profiles.
+
+        :type port: int
+        :param port: The number of the port for the communication, zero is the default profile.
+
+        :type option: str
+        :param option: Name of the option.
+
+        :type value: str
+        :param value: The value of the option.
+
+        :rtype: list
+        :return: The socket profiles.
+        """
+        if option is not None:
+            Tuning.set(int(port), option, str(value))
+        return Tuning.table()
+
+    def hack(self, target: str, retries: int = 5, port: int = None, session: int = None) -> int:
+        """
+        Queue a hack in the target port.
+
+        :type target: str
+        :param target: Name of the hack.
+
+        :type retries: int
+        :param retries: Number of times that it will send the injected package.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type session: int
+        :param session: The ID of the session.
+
+        :rtype: int
+        :return: The port where the hack was queued.
+        """
+        port = self._port(port, session)
+        Queue.hacks(port).append((target, int(retries)))
+        return port
+
+    def send(self, destination: str, packet: str, port: int = None, session: int = None, total: int = 1,
+             rate: float = 0.0) -> dict:
+        """
+        Inject a package. One package is queued and sent with the next traffic of the port, many packages or a rate
+        schedule a job which sends them directly to the session.
+
+        :type destination: str
+        :param destination: It refers to the network target could be client or server.
+
+        :type packet: str
+        :param packet: Raw package in hexadecimal.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type session: int
+        :param session: The ID of the session.
+
+        :type total: int
+        :param total: Number of packages which will be sent.
+
+        :type rate: float
+        :param rate: Packages per second, zero means as fast as possible.
+
+        :rtype: dict
+        :return: The queued port or the information of the job.
+        """
+        if destination not in ('server', 'client'):
+            raise ValueError(f'Unknown destination {destination}')
+        data = bytes.fromhex(packet)
+        total = int(total)
+        rate = float(rate)
+
+        if total == 1 and rate == 0:
+            port = self._port(port, session)
+            queue = Queue.server(port) if destination == 'server' else Queue.client(port)
+            queue.append(data)
+            return {'queued': port}
+
+        target = self._session(port, session)
+        if target is None:
+            raise LookupError('There is no session connected')
+        job = Job(next(self._jobs), target, destination, data, total, rate)
+        self.jobs[job.idx] = job
+        job.start()
+        return job.info()
+
+    def list_jobs(self) -> list:
+        """
+        List the scheduled injections.
+
+        :rtype: list
+        :return: The progress of every job.
+        """
+        return [job.info() for job in list(self.jobs.values())]
+
+    def cancel(self, job: int) -> dict:
+        """
+        Stop a scheduled injection.
+
+        :type job: int
+        :param job: The ID of the job.
+
+        :rtype: dict
+        :return: The progress of the job.
+        """
+        target = self.jobs[int(job)]
+        target.cancel()
+        return target.info()
+
+    @staticmethod
+    def export(flush: bool = False) -> dict:
+        """
+        Get the status of the export of the events.
+
+        :type flush: bool
+        :param flush: True to write the events which are in memory.
+
+        :rtype: dict
+        :return: The status of the export, empty when it is disabled.
+        """
+        if Export.ACTIVE is None:
+            return {}
+        if flush:
+            Export.ACTIVE.flush()
+        return Export.ACTIVE.stats()
+
+    @staticmethod
+    def capture() -> dict:
+        """
+        Get the status of the capture of the traffic.
+
+        :rtype: dict
+        :return: The status of the capture, empty when it is disabled.
+        """
+        if Capture.ACTIVE is None:
+            return {}
+        return Capture.ACTIVE.stats()
+
+    @staticmethod
+    def memory(subsystem: str = None, limit: int = None) -> dict:
+        """
+        Get the memory used by every subsystem and session and optionally change a limit.
+
+        :type subsystem: str
+        :param subsystem: Name of the subsystem whose limit is changed.
+
+        :type limit: int
+        :param limit: The new limit in bytes, zero means without limit.
+
+        :rtype: dict
+        :return: The usage of the memory, empty when the watchdog is disabled.
+        """
+        if subsystem is not None and limit is not None:
+            Memory.set(subsystem, int(limit))
+        if Memory.ACTIVE is None:
+            return {}
+        return Memory.ACTIVE.usage()
+
+    @staticmethod
+    def profile(action: str = 'status', interval: float = None, directory: str = './profile') -> dict:
+        """
+        Control the sampling profiler of the relay threads.
+
+        :type action: str
+        :param action: start, stop, dump or status.
+
+        :type interval: float
+        :param interval: Seconds between two samples when it is started.
+
+        :type directory: str
+        :param directory: The folder of the collapsed stacks when they are dumped.
+
+        :rtype: dict
+        :return: The status of the profiler and the written files, empty when it was never started.
+        """
+        profiler = Profiler.ACTIVE
+        if action == 'start':
+            if profiler is not None and profiler.is_alive():
+                profiler.terminate()
+            profiler = Profiler.ACTIVE = Profiler(float(interval)) if interval else Profiler()
+            profiler.start()
+        elif profiler is None:
+            return {}
+        elif action == 'stop':
+            if profiler.is_alive():
+                profiler.terminate()
+        elif action == 'dump':
+            return dict(profiler.stats(), files=profiler.dump(directory))
+        elif action != 'status':
+            raise ValueError(f'Unknown action: {action}')
+        return profiler.stats()
+
+    @staticmethod
+    def strings() -> dict:
+        """
+        Get the hit rate of the cache of the decoded names.
+
+        :rtype: dict
+        :return: The status of the cache.
+        """
+        return Strings.stats()
+
+    @staticmethod
+    def pacing(name: str = None, rate: float = None, burst: int = None) -> dict:
+        """
+        Get the pacing of the injections of every port and optionally change the token bucket of a class.
+
+        :type name: str
+        :param name: The class whose bucket is changed: loot, reload or other.
+
+        :type rate: float
+        :param rate: Packages per second.
+
+        :type burst: int
+        :param burst: Packages which could be sent together after a quiet period.
+
+        :rtype: dict
+        :return: The buckets of the classes and the status of every port.
+        """
+        if name is not None and rate is not None:
+            Pacing.set(name, rate, Pacing.RATES[name][1] if burst is None and name in Pacing.RATES else burst)
+        return {'rates': Pacing.RATES, 'jitter': Pacing.JITTER,
+                'ports': [pacing.stats() for pacing in list(Pacing.ACTIVE.values())]}
+
+    @staticmethod
+    def positions(flush: bool = False) -> list:
+        """
+        Get the status of the position decoder of every port and the last state of its actors.
+
+        :type flush: bool
+        :param flush: True to decode the records of the windows which are not full.
+
+        :rtype: list
+        :return: The status of every port with the time, position, velocity, speed and teleport flag of its actors.
+        """
+        from core.positions import Positions
+
+        windows = list(Positions.ACTIVE.values())
+        if flush:
+            for window in windows:
+                window.flush()
+        return [dict(window.stats(), actors=window.actors()) for window in windows]
+
+    @staticmethod
+    def predict(port: int, actor: int = None, ahead: float = 0.0) -> list:
+        """
+        Predict the position of the actors of a port.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type actor: int
+        :param actor: The ID of the actor, None predicts all the actors.
+
+        :type ahead: float
+        :param ahead: Seconds in the future of the prediction.
+
+        :rtype: list
+        :return: The actor and its predicted position.
+        """
+        from core.trajectory import Trajectory
+
+        trajectory = Trajectory.get(int(port))
+        if trajectory is None:
+            return []
+        timestamp = time() + float(ahead)
+        if actor is not None:
+            position = trajectory.predict(int(actor), timestamp)
+            return [] if position is None else [{'actor': int(actor), 'x': position[0], 'y': position[1],
+                                                 'z': position[2]}]
+        actors, positions = trajectory.predict_all(timestamp)
+        return [{'actor': int(idx), 'x': float(x), 'y': float(y), 'z': float(z)}
+                for idx, (x, y, z) in zip(actors, positions)]
+
+    def shutdown(self) -> bool:
+        """
+        Request the graceful shutdown of the proxy.
+
+        :rtype: bool
+        :return: Always True.
+        """
+        self.stopped.set()
+        return True
+
+    def _port(self, port: int = None, session: int = None) -> int:
+        """
+        Find the target port, by default the port of the last connected client.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type session: int
+        :param session: The ID of the session.
+
+        :rtype: int
+        :return: The number of the port.
+        """
+        if port is not None:
+            return int(port)
+        target = self._session(None, session)
+        if target is None:
+            raise LookupError('There is no session connected, set the port')
+        return target.port
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Export the events decoded by the parser in columnar batches for the offline analysis. The events are partitioned by
+their name, kept as columns in memory and written in large chunks from a background thread: Parquet files when pyarrow
+is installed, otherwise compressed NumPy files. Without any of them the export is not available.
+"""
+from importlib.util import find_spec
+from os import makedirs, path
+from threading import Thread, Event, Lock
+from time import strftime
+
+
+class Export(Thread):
+    """
+    Keep the events in columns and write them in batches.
+    """
+    ACTIVE = None
+
+    def __init__(self, directory: str, batch_size: int = 65536, interval: float = 30.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type directory: str
+        :param directory: The folder where the batches are written, one sub folder per event.
+
+        :type batch_size: int
+        :param batch_size: Number of events which trigger the write of the batches.
+
+        :type interval: float
+        :param interval: Maximum seconds between two writes.
+
+        :rtype: Export
+        :return: The object instanced of this class.
+        """
+        super(Export, self).__init__()
+        self.name = 'Export'
+        self.daemon = True
+        self.directory = directory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.format = self._format()
+        self.rows = 0
+        self.written = 0
+        self.files = 0
+        self._columns = {}
+        self._pending = []
+        self._lock = Lock()
+        self._flush = Event()
+        self._running = True
+
+    @staticmethod
+    def _format() -> str:
+        """
+        Find the best format which is installed.
+
+        :rtype: str
+        :return: parquet, npz or an empty string.
+        """
+        if find_spec('pyarrow') is not None:
+            return 'parquet'
+        if find_spec('numpy') is not None:
+            return 'npz'
+        return ''
+
+    def add(self, port: int, timestamp: float, events: list) -> None:
+        """
+        Append the events of one package to the columns.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type events: list
+        :param events: The name and the values of every event.
+
+        :rtype: None
+        """
+        if not events or not self.format:
+            return
+
+        with self._lock:
+            for name, fields in events:
+                columns = self._columns.get(name)
+                if columns is None:
+                    columns = {'time': [], 'port': []}
+                    for key in fields:
+                        columns[key] = []
+                    self._columns[name] = columns
+                rows = len(columns['time'])
+                columns['time'].append(timestamp)
+                columns['port'].append(port)
+                for key, value in fields.items():
+                    column = columns.get(key)
+                    if column is None:
+                        column = columns[key] = [None] * rows
+                    column.append(value)
+                for key, column in columns.items():
+                    if len(column) == rows:
+                        column.append(None)
+            self.rows += len(events)
+            if self.rows >= self.batch_size:
+                self._swap()
+
+    def extend(self, port: int, name: str, columns: dict) -> None:
+        """
+        Append many events of the same name which are already in columns, e.g. a decoded window of positions.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type name: str
+        :param name: Name of the events.
+
+        :type columns: dict
+        :param columns: The values of every field, with the time of every event.
+
+        :rtype: None
+        """
+        rows = len(columns.get('time', ()))
+        if not rows or not self.format:
+            return
+
+        with self._lock:
+            current = self._columns.get(name)
+            if current is None:
+                current = self._columns[name] = {'time': [], 'port': []}
+            size = len(current['time'])
+            for key, values in columns.items():
+                column = current.get(key)
+                if column is None:
+                    column = current[key] = [None] * size
+                column.extend(values)
+            current['port'].extend([port] * rows)
+            for column in current.values():
+                if len(column) == size:
+                    column.extend([None] * rows)
+            self.rows += rows
+            if self.rows >= self.batch_size:
+                self._swap()
+
+    def flush(self) -> None:
+        """
+        Write the events which are in memory.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._swap()
+
+    def terminate(self) -> None:
+        """
+        Write the last events and stop the thread.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._running = False
+            self._swap()
+        self.join()
+
+    def stats(self) -> dict:
+        """
+        Describe the export for the control API.
+
+        :rtype: dict
+        :return: The format, the events in memory, the events sent to the writer and the files written.
+        """
+        return {'directory': self.directory, 'format': self.format, 'rows': self.rows, 'written': self.written,
+                'files': self.files}
+
+    def run(self) -> None:
+        """
+        Write the batches when they are full or the interval is over.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while True:
+            self._flush.wait(self.interval)
+            self._flush.clear()
+            with self._lock:
+                if not self._pending:
+                    self._swap()
+                pending, self._pending = self._pending, []
+
+            for columns in pending:
+                for name, values in columns.items():
+                    try:
+                        self._write(name, values)
+                    except Exception as e:
+                        print(f'ERROR: Export {name} ---> {e}')
+
+            with self._lock:
+                if not self._running and not self._pending:
+                    break
+
+    def _swap(self) -> None:
+        """
+        Move the current columns to the pending batches and wake up the thread. The lock must be taken.
+
+        :rtype: None
+        """
+        if self._columns:
+            self._pending.append(self._columns)
+            self._columns = {}
+            self.written += self.rows
+            self.rows = 0
+        self._flush.set()
+
+    def _write(self, name: str, columns: dict) -> None:
+        """
+        Write the columns of one event in a new file.
+
+        :type name: str
+        :param name: Name of the event.
+
+        :type columns: dict
+        :param columns: The values of every field.
+
+        :rtype: None
+        """
+        folder = path.join(self.directory, name)
+        makedirs(folder, exist_ok=True)
+        filename = path.join(folder, f'{strftime("%Y%m%d-%H%M%S")}-{self.files:06}')
+        self.files += 1
+
+        if self.format == 'parquet':
+            from pyarrow import table
+            from pyarrow.parquet import write_table
+            write_table(table(columns), f'{filename}.parquet', compression='zstd')
+        elif self.format == 'npz':
+            from numpy import array, savez_compressed
+            arrays = {}
+            for key, values in columns.items():
+                if any(value is None for value in values):
+                    arrays[key] = array(values, dtype=object)
+                else:
+                    arrays[key] = array(values)
+            savez_compressed(f'{filename}.npz', **arrays)
@@ -3,25 +3,31 @@
 """
 Inject data in the main package.
 """
-from logging import basicConfig, DEBUG, debug
+from logging import debug
 
 from core.hack import Hack
+from core.pacing import Pacing
+from core.queue import Packets
 
 
 class Inject:
     """
     Inject data in the current package.
     """
+    FIRE_BALLS = bytes.fromhex('656501000000')
 
-    def __init__(self) -> None:
+    def __init__(self, pacing: Pacing = None) -> None:
         """
         Constructor which init the class.
 
+        :type pacing: Pacing
+        :param pacing: The pacing of the injections of the port, None sends them with every matching package.
+
         :rtype: None
         """
-        basicConfig(filename='./debug.log', filemode='a', level=DEBUG, format='%(message)s')
+        self.pacing = pacing
         self.data = bytearray()
-        self.pending = []
+        self.pending = Packets('inject')
 
         self.retries = 1
         self.active = False
@@ -31,12 +37,12 @@ class Inject:
         self.current_hack = ''
         self.fixed_position = bytearray()
 
-    def run(self, data: bytes, destination: str) -> bytes:
+    def run(self, data: memoryview, destination: str) -> bytes:
         """
         Increment validate and update the data.
 
-        :type data: bytes
-        :param data: Raw data.
+        :type data: memoryview
+        :param data: Raw data. It is a view of the receive buffer and it is not copied unless it is modified.
 
         :type destination: str
         :param destination: It refers to the network target could be client or server.
@@ -56,12 +62,12 @@ class Inject:
             debug(message)
             self._clean_state()
 
-        if destination == self.destination and idx == self.idx:
-            self.retries -= 1
-
+        # The package is only changed and a retry is only spent when the pacing lets the package be injected
+        if destination == self.destination and idx == self.idx and \
+                (self.pacing is None or self.pacing.allow(destination, self.FIRE_BALLS)):
             if len(self.fixed_position) > 0:
-                self.data = self.data[:2] + self.fixed_position + self.data[14:]
-
+                self.data = bytes(self.data[:2]) + self.fixed_position + self.data[14:]
+            self.retries -= 1
             self._execute_hack()
         return self.data
 
@@ -105,7 +111,7 @@ class Inject:
             if len(self.pending) == 0:
                 return
 
-            self.current_hack = self.pending.pop(0)
+            self.current_hack = self.pending.popleft()
             self.working = True
 
         if self.current_hack == Hack.fire_balls:
@@ -117,8 +123,7 @@ class Inject:
 
         :rtype: None
         """
-        data = bytearray.fromhex('656501000000')
-        self.data = data + self.data
+        self.data = self.FIRE_BALLS + self.data
         message = f'*** Injection: Hacking {Hack.fire_balls}'
         print(message)
         debug(message)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Configure the debug log once for the whole proxy. The log of the previous run is rotated instead of truncated, so it is
+still available after a restart, and the current log is rotated when it is too big.
+"""
+from logging import basicConfig, DEBUG
+from logging.handlers import RotatingFileHandler
+from os import path
+
+
+class Log:
+    """
+    Setup of the debug log.
+    """
+
+    @staticmethod
+    def setup(filename: str = './debug.log', max_bytes: int = 67108864, backups: int = 5) -> None:
+        """
+        Rotate the previous log and send the debug messages to a new one.
+
+        :type filename: str
+        :param filename: Path of the log.
+
+        :type max_bytes: int
+        :param max_bytes: Size from which the current log is rotated.
+
+        :type backups: int
+        :param backups: Number of old logs which are kept, debug.log.1 is the newest.
+
+        :rtype: None
+        """
+        handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backups, delay=True)
+        if path.exists(filename) and path.getsize(filename) > 0:
+            handler.doRollover()
+        basicConfig(handlers=[handler], level=DEBUG, format='%(message)s')
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Account the memory held by the proxy and keep it under the limits. Every subsystem which keeps data between the packages
+has a limit in bytes and a defined way to shed the excess: the queues of packages and the pending hacks drop the oldest
+entries, the unknown data of the parser is truncated, the receive buffers do not grow over their limit, the actors which
+are not seen anymore are removed from the trajectories and the sessions whose threads are finished are closed, so their
+sockets are released. Over the limit of the resident memory all the queued packages are dropped. The limits of the
+queues, the hacks, the injections, the unknown data and the buffers are per instance, the others are for the process.
+"""
+from os import sysconf
+from sys import getsizeof, modules
+from threading import Thread, Event, Lock
+from time import monotonic, time
+
+from core.router import Router
+
+
+class Memory(Thread):
+    """
+    Watchdog which enforces the limits and reports the usage per subsystem and per session.
+    """
+    ACTIVE = None
+    LIMITS = {
+        'queue': 1048576,
+        'hacks': 65536,
+        'inject': 4096,
+        'unknown': 65536,
+        'buffer': 262144,
+        'trajectory': 16777216,
+        'rss': 0,
+    }
+    SHED = dict.fromkeys(LIMITS, 0)
+    _lock = Lock()
+
+    def __init__(self, router: Router, interval: float = 5.0, linger: float = 30.0, stale: float = 60.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type router: Router
+        :param router: The routing table with the listeners and their sessions.
+
+        :type interval: float
+        :param interval: Seconds between two checks.
+
+        :type linger: float
+        :param linger: Seconds that a session could live with only one of its threads running.
+
+        :type stale: float
+        :param stale: Seconds after which an actor without positions is removed from the trajectories.
+
+        :rtype: Memory
+        :return: The object instanced of this class.
+        """
+        super(Memory, self).__init__()
+        self.name = 'Memory'
+        self.daemon = True
+        self.router = router
+        self.interval = interval
+        self.linger = linger
+        self.stale = stale
+        self.reaped = 0
+        self._finished = {}
+        self._stopped = Event()
+
+    @staticmethod
+    def limit(subsystem: str) -> int:
+        """
+        Get the limit of a subsystem.
+
+        :type subsystem: str
+        :param subsystem: Name of the subsystem.
+
+        :rtype: int
+        :return: The limit in bytes, zero means without limit.
+        """
+        return Memory.LIMITS[subsystem]
+
+    @staticmethod
+    def set(subsystem: str, limit: int) -> None:
+        """
+        Change the limit of a subsystem. The receive buffers which already exist keep their limit.
+
+        :type subsystem: str
+        :param subsystem: Name of the subsystem.
+
+        :type limit: int
+        :param limit: The limit in bytes, zero means without limit.
+
+        :rtype: None
+        """
+        if subsystem not in Memory.LIMITS:
+            raise ValueError(f'Unknown subsystem: {subsystem}')
+        if subsystem == 'buffer' and 0 < int(limit) < 4096:
+            raise ValueError('The receive buffers need at least 4096 bytes or zero without limit')
+        Memory.LIMITS[subsystem] = int(limit)
+
+    @staticmethod
+    def shed(subsystem: str, size: int) -> None:
+        """
+        Count the bytes dropped by a subsystem.
+
+        :type subsystem: str
+        :param subsystem: Name of the subsystem.
+
+        :type size: int
+        :param size: Number of bytes dropped.
+
+        :rtype: None
+        """
+        with Memory._lock:
+            Memory.SHED[subsystem] += size
+
+    @staticmethod
+    def size(item: object) -> int:
+        """
+        Estimate the bytes held by an entry of a queue.
+
+        :type item: object
+        :param item: Raw package, name of a hack or any other object.
+
+        :rtype: int
+        :return: The size in bytes.
+        """
+        if isinstance(item, (bytes, bytearray, memoryview, str)):
+            return len(item)
+        return getsizeof(item)
+
+    @staticmethod
+    def rss() -> int:
+        """
+        Get the resident memory of the process.
+
+        :rtype: int
+        :return: The size in bytes, zero when it is not available.
+        """
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    def terminate(self) -> None:
+        """
+        Stop the watchdog.
+
+        :rtype: None
+        """
+        self._stopped.set()
+        self.join()
+
+    def run(self) -> None:
+        """
+        Enforce the limits every interval.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while not self._stopped.wait(self.interval):
+            try:
+                self.collect()
+            except Exception as e:
+                print(f'ERROR: Memory ---> {e}')
+
+    def collect(self) -> None:
+        """
+        Close the finished sessions, remove the stale actors and drop the queued packages over the resident limit.
+
+        :rtype: None
+        """
+        from core.queue import Queue
+        from core.session import Session
+
+        now = monotonic()
+        for proxy in list(self.router.listeners.values()):
+            for session in list(proxy.sessions):
+                if session.idx not in Session.ACTIVE:
+                    continue
+                alive = [thread.is_alive() for thread in (session.client_to_server, session.server_to_client)]
+                if all(alive):
+                    self._finished.pop(session.idx, None)
+                    continue
+                first = self._finished.setdefault(session.idx, now)
+                if first < now and (not any(alive) or now - first >= self.linger):
+                    proxy.close_session(session)
+                    self.reaped += 1
+        for idx in [idx for idx in self._finished if idx not in Session.ACTIVE]:
+            del self._finished[idx]
+
+        trajectories = self._trajectories()
+        for trajectory in trajectories:
+            trajectory.prune(time() - self.stale)
+        limit = self.limit('trajectory')
+        if limit and sum(trajectory.nbytes for trajectory in trajectories) > limit:
+            for trajectory in trajectories:
+                trajectory.prune(time() - trajectory.horizon)
+
+        limit = self.limit('rss')
+        if limit and self.rss() > limit:
+            dropped = 0
+            for queues in (Queue.SERVER_QUEUE, Queue.CLIENT_QUEUE, Queue.HACKS):
+                for queue in list(queues.values()):
+                    dropped += queue.shed()
+            print(f'*** Memory: Resident memory over {limit} bytes, {dropped} queued bytes dropped')
+
+    def usage(self) -> dict:
+        """
+        Describe the memory for the control API.
+
+        :rtype: dict
+        :return: The resident memory, the usage of every subsystem and the usage of every session.
+        """
+        from core.queue import Queue
+        from core.session import Session
+
+        used = dict.fromkeys(self.LIMITS, 0)
+        used['rss'] = self.rss()
+        used['queue'] = sum(queue.bytes for queues in (Queue.SERVER_QUEUE, Queue.CLIENT_QUEUE)
+                            for queue in list(queues.values()))
+        used['hacks'] = sum(queue.bytes for queue in list(Queue.HACKS.values()))
+        used['trajectory'] = sum(trajectory.nbytes for trajectory in self._trajectories())
+
+        sessions = []
+        for session in list(Session.ACTIVE.values()):
+            buffers = inject = 0
+            for thread in (session.client_to_server, session.server_to_client):
+                if thread.package is not None:
+                    buffers += thread.package.buffer.capacity
+                    inject += thread.package.inject.pending.bytes
+            queued = Queue.server(session.port).bytes + Queue.client(session.port).bytes
+            used['buffer'] += buffers
+            used['inject'] += inject
+            sessions.append({'session': session.idx, 'port': session.port, 'buffers': buffers, 'inject': inject,
+                             'queued': queued, 'bytes': buffers + inject + queued})
+
+        subsystems = [{'subsystem': name, 'bytes': used[name], 'limit': limit, 'shed': self.SHED[name]}
+                      for name, limit in self.LIMITS.items()]
+        return {'rss': used['rss'], 'reaped': self.reaped, 'subsystems': subsystems, 'sessions': sessions}
+
+    @staticmethod
+    def _trajectories() -> list:
+        """
+        Get the ring buffers of every port. They are only loaded by the parser, so NumPy is not imported here.
+
+        :rtype: list
+        :return: The trajectories, empty when the parser has not run yet.
+        """
+        module = modules.get('core.trajectory')
+        if module is None:
+            return []
+        return list(module.Trajectory.ACTIVE.values())
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Pace the injected packages, so the server does not see bursts which a real client never sends. Every class of package
+(loot, reload and the others) has a token bucket per destination and between two injections there is at least the
+interval of the positions sent by the client (0x6d76) with some jitter. The packages which are not allowed wait in their
+queue for the next traffic and every held package is counted once as deferred.
+"""
+from collections import Counter
+from random import Random
+from threading import Lock
+from time import monotonic
+
+
+class Pacing:
+    """
+    Token buckets and cadence of the injections of one port.
+    """
+    ACTIVE = {}
+    POSITION = b'\x6d\x76'
+    CLASSES = {b'\x65\x65': 'loot', b'\x72\x6c': 'reload'}
+    RATES = {'loot': [5.0, 3], 'reload': [2.0, 1], 'other': [10.0, 5]}
+    JITTER = 0.2
+
+    def __init__(self, port: int, smoothing: float = 0.1, idle: float = 1.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type smoothing: float
+        :param smoothing: Weight of the last interval in the average of the cadence.
+
+        :type idle: float
+        :param idle: Seconds from which a gap between two positions is not part of the cadence.
+
+        :rtype: Pacing
+        :return: The object instanced of this class.
+        """
+        self.port = port
+        self.smoothing = smoothing
+        self.idle = idle
+        self.cadence = 0.0
+        self.delay = 0.0
+        self.sent = Counter()
+        self.deferred = Counter()
+        self._last_position = None
+        self._buckets = {}
+        self._next = {}
+        self._waiting = {}
+        self._random = Random()
+        self._lock = Lock()
+
+    @staticmethod
+    def get(port: int) -> 'Pacing':
+        """
+        Get the pacing of the port, it is created the first time.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Pacing
+        :return: The pacing of the port.
+        """
+        pacing = Pacing.ACTIVE.get(port)
+        if pacing is None:
+            pacing = Pacing.ACTIVE.setdefault(port, Pacing(port))
+        return pacing
+
+    @staticmethod
+    def classify(packet: bytes) -> str:
+        """
+        Get the class of a package from its ID.
+
+        :type packet: bytes
+        :param packet: Raw package.
+
+        :rtype: str
+        :return: loot, reload or other.
+        """
+        return Pacing.CLASSES.get(bytes(packet[:2]), 'other')
+
+    @staticmethod
+    def set(name: str, rate: float, burst: int) -> None:
+        """
+        Change the token bucket of a class.
+
+        :type name: str
+        :param name: loot, reload or other.
+
+        :type rate: float
+        :param rate: Packages per second.
+
+        :type burst: int
+        :param burst: Packages which could be sent together after a quiet period.
+
+        :rtype: None
+        """
+        if name not in Pacing.RATES:
+            raise ValueError(f'Unknown class: {name}')
+        Pacing.RATES[name] = [float(rate), max(int(burst), 1)]
+
+    def observe(self) -> None:
+        """
+        Update the cadence with a position sent by the client.
+
+        :rtype: None
+        """
+        now = monotonic()
+        with self._lock:
+            if self._last_position is not None:
+                interval = now - self._last_position
+                if 0 < interval < self.idle:
+                    if self.cadence:
+                        self.cadence += self.smoothing * (interval - self.cadence)
+                    else:
+                        self.cadence = interval
+            self._last_position = now
+
+    def allow(self, destination: str, packet: bytes) -> bool:
+        """
+        Decide if a package could be injected now. It is allowed when the bucket of its class has a token and the
+        interval since the previous injection to the destination is over.
+
+        :type destination: str
+        :param destination: It refers to the network target could be client or server.
+
+        :type packet: bytes
+        :param packet: Raw package.
+
+        :rtype: bool
+        :return: True if it is sent now, False if it has to wait.
+        """
+        name = self.classify(packet)
+        key = (destination, name)
+        rate, burst = self.RATES[name]
+        now = monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            if tokens < 1 or now < self._next.get(destination, 0.0):
+                self._buckets[key] = (tokens, now)
+                # The held package is checked again with every chunk, it is only counted the first time
+                if key not in self._waiting:
+                    self._waiting[key] = now
+                    self.deferred[name] += 1
+                return False
+
+            self._buckets[key] = (tokens - 1, now)
+            self._next[destination] = now + self.cadence * (1 + self._random.uniform(-self.JITTER, self.JITTER))
+            self.delay += now - self._waiting.pop(key, now)
+            self.sent[name] += 1
+            return True
+
+    def stats(self) -> dict:
+        """
+        Describe the pacing for the control API.
+
+        :rtype: dict
+        :return: The cadence, the sent and deferred packages per class, the total delay and the waiting classes.
+        """
+        with self._lock:
+            return {'port': self.port, 'cadence': self.cadence, 'sent': dict(self.sent),
+                    'deferred': dict(self.deferred), 'delay': self.delay,
+                    'waiting': [f'{destination}:{name}' for destination, name in self._waiting]}
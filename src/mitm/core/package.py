@@ -9,14 +9,29 @@ GPL-3.0 License
 """
 from importlib import reload
 from logging import debug
-from socket import socket
+from os import close, pipe
+from socket import socket, SHUT_WR
 from sys import exc_info
+from threading import Lock
+from time import time
 from traceback import format_exception
 
-import core.parser
+from core.buffer import Buffer
+from core.capture import Capture
+from core.export import Export
 from core.hack import Hack
 from core.inject import Inject
+from core.memory import Memory
+from core.pacing import Pacing
+from core.passthrough import Passthrough
 from core.queue import Queue
+from core.router import Router
+from core.tuning import Tuning
+
+try:
+    from os import splice
+except ImportError:
+    splice = None
 
 
 class Package:
@@ -24,7 +39,7 @@ class Package:
     Manage the packages. It could be receive, send and inject.
     """
 
-    def __init__(self, is_server: bool, source: socket, destination: socket, port: int) -> None:
+    def __init__(self, is_server: bool, source: socket, destination: socket, port: int, router: Router = None) -> None:
         """
         Constructor which init the class.
 
@@ -40,6 +55,9 @@ class Package:
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type router: Router
+        :param router: The routing table which learns the game servers from this traffic. None means no learning.
+
         :rtype: Package
         :return: The object instanced of this class.
         """
@@ -48,6 +66,11 @@ class Package:
         self.source = source
         self.destination = destination
         self.port = port
+        self.router = router
+        self.buffer = Buffer(maximum=Memory.limit('buffer'))
+        self.pacing = Pacing.get(port)
+        self.inject = Inject(self.pacing)
+        self._lock = Lock()
 
     def terminate(self) -> None:
         """
@@ -57,6 +80,18 @@ class Package:
         """
         self.running = False
 
+    def send(self, packet: bytes) -> None:
+        """
+        Send a package to the destination immediately. It is not mixed with the data which is being forwarded.
+
+        :type packet: bytes
+        :param packet: Raw package.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.destination.sendall(packet)
+
     def start(self) -> None:
         """
         Handle the packages.
@@ -66,47 +101,156 @@ class Package:
         if self.is_server:
             source = 'server'
             destination = 'client'
-            queue = Queue.CLIENT_QUEUE
+            queue = Queue.client(self.port)
         else:
             source = 'client'
             destination = 'server'
-            queue = Queue.SERVER_QUEUE
+            queue = Queue.server(self.port)
+        hacks = Queue.hacks(self.port)
+
+        inject = self.inject
+        pacing = self.pacing
+        profile = Tuning.profile(self.port)
+        import core.parser
+
+        try:
+            while self.running:
+                if self.port in Passthrough.PORTS:
+                    self._passthrough()
+                    continue
 
-        inject = Inject()
+                data = self.buffer.receive(self.source)
+                if not data:
+                    self._close_destination()
+                else:
+                    if profile['quickack']:
+                        Tuning.quickack(self.source)
+                    if not self.is_server and data[:2] == Pacing.POSITION:
+                        pacing.observe()
 
-        while self.running:
-            data: bytes = self.source.recv(4096)
-            if data:
-                try:
-                    data = inject.run(data, destination)
+                    packet = None
+                    parse = None
+                    try:
+                        if self.router:
+                            self.router.learn(data)
 
-                    if len(Queue.HACKS):
-                        target, retries = Queue.HACKS.pop(0)
-                        if target.lower() == Hack.fire_balls.lower():
-                            inject.get_fire_balls(retries)
+                        data = inject.run(data, destination)
 
-                    if len(queue) > 0:
-                        packet: bytes = queue.pop(0)
-                        message = f'--*-- Send to {destination}: {packet.hex()}'
+                        if len(hacks):
+                            target, retries = hacks.popleft()
+                            if target.lower() == Hack.fire_balls.lower():
+                                inject.get_fire_balls(retries)
+
+                        if len(queue) > 0 and pacing.allow(destination, queue[0]):
+                            packet: bytes = queue.popleft()
+                            message = f'--*-- Send to {destination}: {packet.hex()}'
+                            print(message)
+                            debug(message)
+
+                        reload(core.parser)
+                        parse = core.parser.Parse(data)
+
+                        if self.is_server:
+                            parse.server(self.port)
+                        else:
+                            parse.client(self.port)
+
+                        if Export.ACTIVE is not None:
+                            Export.ACTIVE.add(self.port, parse.time, parse.events)
+
+                    except Exception as e:
+                        error_type, value, traceback = exc_info()
+                        message = f'ERROR: {source}[{self.port}]: {e}\n' \
+                                  f'{"".join(format_exception(error_type, value, traceback))}' \
+                                  f'  -> {data.hex()}\n' \
+                                  f'\n\n'
                         print(message)
                         debug(message)
-                        self.destination.sendall(packet)
-
-                    reload(core.parser)
-                    parse = core.parser.Parse(data)
-
-                    if self.is_server:
-                        parse.server(self.port)
-                    else:
-                        parse.client(self.port)
-
-                except Exception as e:
-                    error_type, value, traceback = exc_info()
-                    message = f'ERROR: {source}[{self.port}]: {e}\n' \
-                              f'{"".join(format_exception(error_type, value, traceback))}' \
-                              f'  -> {data.hex()}\n' \
-                              f'\n\n'
-                    print(message)
-                    debug(message)
+
+                    if Capture.ACTIVE is not None:
+                        if parse is None:
+                            Capture.ACTIVE.add(self.port, self.is_server, time(), data, [])
+                        else:
+                            Capture.ACTIVE.add(self.port, self.is_server, parse.time, data, parse.events)
+                    self._forward(packet, data, profile['cork'])
+        except OSError as e:
+            message = f'ERROR: {source}[{self.port}]: Connection lost ---> {e}'
+            print(message)
+            debug(message)
+        finally:
+            self._close_destination()
+            self.source.close()
+
+    def _forward(self, packet: bytes, data: bytes, cork: bool) -> None:
+        """
+        Send the queued package followed by the data. With cork both writes are coalesced in the same frames.
+
+        :type packet: bytes
+        :param packet: The package taken from the queue, None if the queue was empty.
+
+        :type data: bytes
+        :param data: The received data after the injection.
+
+        :type cork: bool
+        :param cork: True to batch the writes with TCP_CORK.
+
+        :rtype: None
+        """
+        with self._lock:
+            if packet is None:
                 self.destination.sendall(data)
-        self.source.close()
+                return
+
+            if cork:
+                Tuning.cork(self.destination, True)
+            try:
+                self.destination.sendall(packet)
+                self.destination.sendall(data)
+            finally:
+                if cork:
+                    Tuning.cork(self.destination, False)
+
+    def _passthrough(self) -> None:
+        """
+        Relay the packages without inject or parse them until the port leaves the pass-through mode. In Linux the data
+        is moved in kernel space through a pipe with splice, otherwise it is received in the reusable buffer.
+
+        :rtype: None
+        """
+        if splice is None:
+            while self.running and self.port in Passthrough.PORTS:
+                data = self.buffer.receive(self.source)
+                if not data:
+                    self._close_destination()
+                    break
+                with self._lock:
+                    self.destination.sendall(data)
+            return
+
+        source = self.source.fileno()
+        destination = self.destination.fileno()
+        read, write = pipe()
+        try:
+            while self.running and self.port in Passthrough.PORTS:
+                size = splice(source, write, 65536)
+                if size == 0:
+                    self._close_destination()
+                    break
+                with self._lock:
+                    while size > 0:
+                        size -= splice(read, destination, size)
+        finally:
+            close(read)
+            close(write)
+
+    def _close_destination(self) -> None:
+        """
+        The source closed the connection, so stop the execution and close the sending side of the destination.
+
+        :rtype: None
+        """
+        self.running = False
+        try:
+            self.destination.shutdown(SHUT_WR)
+        except OSError:
+            pass
@@ -8,10 +8,17 @@ This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/
 GPL-3.0 License
 """
 from datetime import datetime
-from logging import basicConfig, DEBUG, debug
-from struct import unpack, pack
+from time import time
+from logging import debug
+from struct import unpack, pack, Struct
 
+from core.memory import Memory
+from core.positions import Positions
 from core.queue import Queue
+from core.strings import Strings
+from core.trajectory import Trajectory
+
+POSITION = Struct('<fff4shbb')
 
 
 class Parse:
@@ -19,21 +26,30 @@ class Parse:
     Parse the data and find patterns to display a useful information.
     """
 
-    def __init__(self, data: bytes) -> None:
+    def __init__(self, data: memoryview, live: bool = True) -> None:
         """
         Constructor which init the class.
 
-        :type data: bytes
-        :param data: Raw data.
+        :type data: memoryview
+        :param data: Raw data. The slices of a memoryview are not copied while the data is parsed.
+
+        :type live: bool
+        :param live: False when a recorded session is replayed, so the packages are not queued or displayed. Only then
+                     the opcodes and the unknown regions are kept for the analysis.
 
         :rtype: None
         """
-        basicConfig(filename='./debug.log', filemode='a', level=DEBUG, format='%(message)s')
+        self.port = 0
+        self.live = live
+        self.time = time()
+        self.events = []
+        self.opcodes = []
+        self.unknown = []
         self.message = ''
         self.should_display_message = False
         self.show_data = False
-        self.data_original: bytes = data
-        self.data: bytes = data
+        self.data_original: memoryview = memoryview(data)
+        self.data: memoryview = memoryview(data)
 
     def _get_number_int_unsigned(self) -> int:
         """
@@ -68,20 +84,67 @@ class Parse:
         self.data = self.data[size:]
         return data
 
-    def _general_position(self) -> None:
+    def _get_string(self, length: int) -> str:
         """
-        Get the position with AXIS (x,y,z) and the camera view.
+        Split the name and decode it. The names are cached, so the repeated names are not decoded again.
+
+        :type length: int
+        :param length: Size of the name.
+
+        :rtype: str
+        :return: The decoded name.
+        """
+        return Strings.decode(self._get_data(length))
+
+    def _event(self, event_type: str, **fields) -> None:
+        """
+        Keep the values of the package as a structured event, e.g. for the export.
+
+        :type event_type: str
+        :param event_type: Name of the event, the fields could have a name too.
+
+        :type fields: dict
+        :param fields: The decoded values of the package.
 
         :rtype: None
         """
-        x, y, z, = unpack('<fff', self._get_data(4 * 3))
-        view = self.data[:4]
-        self._get_data(4)
-        view_limit, dy, dx = unpack('<hbb', self._get_data(4))
+        self.events.append((event_type, fields))
+
+    def _trajectory(self, actor: int, x: float, y: float, z: float) -> None:
+        """
+        Add the position to the ring buffer of the actor for the prediction.
+
+        :type actor: int
+        :param actor: The ID of the actor, zero for your player.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        trajectory = Trajectory.get(self.port) if self.live else None
+        if trajectory is not None:
+            trajectory.add(actor, self.time, x, y, z)
+
+    def _general_position(self) -> tuple:
+        """
+        Get the position with AXIS (x,y,z) and the camera view.
+
+        :rtype: tuple
+        :return: The position x, y, z, the direction x, y and the view limit.
+        """
+        x, y, z, view, view_limit, dy, dx = POSITION.unpack(self._get_data(POSITION.size))
         message = f'{x:10.2f} X | {y:10.2f} Y | {z:10.2f} Z | Direction X: {dx:4} | Y: {dy:4} | ' \
                   f'View: {view.hex()} | View limit: {view_limit}'
 
         self.message += f'    |-> {message}\n'
+        return x, y, z, dx, dy, view_limit
 
     def _client_position(self) -> None:
         """
@@ -89,8 +152,16 @@ class Parse:
 
         :rtype: None
         """
+        record = self.data[:POSITION.size]
+        if self.live and len(record) == POSITION.size and Positions.get(self.port).add_client(self.time, record):
+            # The window decodes and publishes the position, so the record is only skipped here
+            self._get_data(POSITION.size)
+            return
+
         self.message += f'  |-> My Position\n'
-        self._general_position()
+        x, y, z, dx, dy, view_limit = self._general_position()
+        self._trajectory(0, x, y, z)
+        self._event('client_position', x=x, y=y, z=z, dx=dx, dy=dy, view_limit=view_limit)
 
     def _client_shoot(self) -> None:
         """
@@ -99,13 +170,13 @@ class Parse:
         :rtype: None
         """
         length = self._get_number_short_unsigned()
-        name, = unpack('%ds' % length, self._get_data(length))
-        name = str(name, 'UTF-8')
+        name = self._get_string(length)
         x, y, z = unpack('<fff', self._get_data(4 * 3))
 
         self.message += f'  |-> Shoot\n'
         self.message += f'    |-> Name: {name}\n'
         self.message += f'    |-> Position: X: {x:{2}f} | Y: {y:{2}f} | Z: {z:{2}f}\n'
+        self._event('client_shoot', name=name, x=x, y=y, z=z)
 
     def _client_shooting(self) -> None:
         """
@@ -117,6 +188,7 @@ class Parse:
 
         self.message += f'  |-> Shooting\n'
         self.message += f'    |-> Automatic: {value}\n'
+        self._event('client_shooting', automatic=value)
 
     def _client_jump(self) -> None:
         """
@@ -128,6 +200,7 @@ class Parse:
 
         self.message += f'  |-> Jump\n'
         self.message += f'    |-> Ready: {ready}\n'
+        self._event('client_jump', ready=ready)
 
     def _client_item(self) -> None:
         """
@@ -139,6 +212,7 @@ class Parse:
 
         self.message += f'  |-> Item\n'
         self.message += f'    |-> ID: {idx}\n'
+        self._event('client_item', item=idx)
 
     def _general_weapon_slot(self) -> None:
         """
@@ -150,7 +224,9 @@ class Parse:
 
         self.message += f'  |-> Weapon\n'
         self.message += f'    |-> Slot: {weapon_slot + 1}\n'
-        Queue.SERVER_QUEUE.append(b'\x72\x6C')
+        self._event('weapon_slot', slot=weapon_slot + 1)
+        if self.live:
+            Queue.server(self.port).append(b'\x72\x6C')
 
     def _client_weapon_reload(self) -> None:
         """
@@ -159,6 +235,7 @@ class Parse:
         :rtype: None
         """
         self.message += f'  |-> Weapon Reload\n'
+        self._event('client_weapon_reload')
 
     def _server_weapon_reload(self) -> None:
         """
@@ -167,17 +244,16 @@ class Parse:
         :rtype: None
         """
         weapon_length = self._get_number_short_unsigned()
-        weapon = str(self.data[:weapon_length], 'UTF-8')
-        self._get_data(weapon_length)
+        weapon = self._get_string(weapon_length)
         ammo_length = self._get_number_short_unsigned()
-        ammo = str(self.data[:ammo_length], 'UTF-8')
-        self._get_data(ammo_length)
+        ammo = self._get_string(ammo_length)
         bullets = self._get_number_int_unsigned()
 
         self.message += f'  |-> Weapon Reload\n'
         self.message += f'    |-> Name: {weapon}\n'
         self.message += f'    |-> Ammo: {ammo}\n'
         self.message += f'    |-> Bullets: {bullets}\n'
+        self._event('weapon_reload', weapon=weapon, ammo=ammo, bullets=bullets)
 
     def _client_quest_selected(self) -> None:
         """
@@ -186,12 +262,11 @@ class Parse:
         :rtype: None
         """
         length = self._get_number_short_unsigned()
-        name = self.data[:length]
-        name = str(name, 'UTF-8')
-        self._get_data(length)
+        name = self._get_string(length)
 
         self.message += f'  |-> Quest Selected\n'
         self.message += f'    |-> Name: {name}\n'
+        self._event('quest_selected', name=name)
 
     def _general_constant_information(self) -> None:
         """
@@ -217,9 +292,10 @@ class Parse:
         """
         self.message += f'  |-> My Character\n'
         self._server_character_position()
-        self._general_position()
+        x, y, z, dx, dy, view_limit = self._general_position()
         idx_3 = self._get_number_int_unsigned()
         self.message += f'    |-> ID #3: {idx_3}\n'
+        self._event('my_position', x=x, y=y, z=z, dx=dx, dy=dy, view_limit=view_limit, actor_3=idx_3)
 
     def _server_character_position(self) -> None:
         """
@@ -227,13 +303,21 @@ class Parse:
 
         :rtype: None
         """
-        idx = self._get_number_int_unsigned()
+        record = self.data[:POSITION.size + 8]
+        if self.live and len(record) == POSITION.size + 8 and Positions.get(self.port).add_character(self.time, record):
+            # The window decodes and publishes the position, so the record is only skipped here
+            self._get_data(POSITION.size + 8)
+            return
 
+        idx = self._get_number_int_unsigned()
         self.message += f'  |-> Character Position\n'
         self.message += f'    |-> ID #1: {idx}\n'
-        self._general_position()
+        x, y, z, dx, dy, view_limit = self._general_position()
+        self._trajectory(idx, x, y, z)
         idx_2 = self._get_number_int_unsigned()
         self.message += f'    |-> ID #2: {idx_2}\n'
+        self._event('character_position', actor=idx, x=x, y=y, z=z, dx=dx, dy=dy, view_limit=view_limit,
+                    actor_2=idx_2)
 
     def _server_monsters_list(self) -> None:
         """
@@ -245,6 +329,7 @@ class Parse:
 
         self.message += f'  |-> Monster List\n'
         self.message += f'    |-> ID: {idx}\n'
+        self._event('monster', actor=idx)
 
     def _server_gun_shoot(self) -> None:
         """
@@ -253,16 +338,15 @@ class Parse:
         :rtype: None
         """
         length = self._get_number_short_unsigned()
-        weapon = self.data[:length]
-        weapon = str(weapon, 'UTF-8')
-        self._get_data(length)
+        weapon = self._get_string(length)
         bullets = self._get_number_int_unsigned()
 
         self.message += f'  |-> Gun Shoot\n'
         self.message += f'    |-> Name: {weapon}\n'
         self.message += f'    |-> Bullets: {bullets}\n'
-        if bullets == 0:
-            Queue.SERVER_QUEUE.append(b'\x72\x6C')
+        self._event('gun_shoot', weapon=weapon, bullets=bullets)
+        if bullets == 0 and self.live:
+            Queue.server(self.port).append(b'\x72\x6C')
 
     def _server_magic_shoot(self) -> None:
         """
@@ -274,6 +358,7 @@ class Parse:
 
         self.message += f'  |-> Magic Shoot\n'
         self.message += f'    |-> Counter: {counter}\n'
+        self._event('magic_shoot', counter=counter)
 
     def _server_constant_information(self) -> None:
         """
@@ -299,8 +384,7 @@ class Parse:
         self._get_data(4)
         boolean, = unpack('<b', self._get_data(1))
         length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
+        name = self._get_string(length)
         x, y, z, = unpack('<fff', self._get_data(12))
         d1 = self.data[:1]
         d2 = self.data[1:2]
@@ -312,9 +396,9 @@ class Parse:
         type_object = self._get_number_int_unsigned()
 
         # Auto loot
-        if 'Drop' in name:
+        if 'Drop' in name and self.live:
             pickup = pack('=HI', 0x6565, idx)
-            Queue.SERVER_QUEUE.append(pickup)
+            Queue.server(self.port).append(pickup)
             pickup_message = f'--*-- Pickup the {name} -> ID: {idx} | Hex: {pickup.hex()}\n'
             print(pickup_message)
             debug(pickup_message)
@@ -325,6 +409,7 @@ class Parse:
                   f'{name}'
         self.message += f'  |-> Init Information\n'
         self.message += f'    |-> {message}\n'
+        self._event('init', actor=idx, name=name, type=type_object, x=x, y=y, z=z)
 
     def _server_health(self) -> None:
         """
@@ -337,6 +422,7 @@ class Parse:
         self.message += f'  |-> Health\n'
         self.message += f'    |-> Character: {idx}\n'
         self.message += f'    |-> Health: {health}\n'
+        self._event('health', actor=idx, health=health)
 
     def _server_character_action(self) -> None:
         """
@@ -346,8 +432,7 @@ class Parse:
         """
         status = None
         idx, length, = unpack('<IH', self._get_data(6))
-        action = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
+        action = self._get_string(length)
         if len(self.data) > 0:
             last_digit = self.data[:1].hex()
             if last_digit in ('00', '01'):
@@ -355,6 +440,7 @@ class Parse:
 
         self.message += f'  |-> Action\n'
         self.message += f'    |-> Character: {idx} | {action} | {status}\n'
+        self._event('action', actor=idx, action=action, status=status)
 
     def _server_item(self) -> None:
         """
@@ -363,13 +449,13 @@ class Parse:
         :rtype: None
         """
         length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
+        name = self._get_string(length)
         amount = self._get_number_int_unsigned()
 
         self.message += f'  |-> Item\n'
         self.message += f'    |-> Name: {name}\n'
         self.message += f'    |-> Amount: {amount}\n'
+        self._event('item', name=name, amount=amount)
 
     def _server_item_recollection(self) -> None:
         """
@@ -378,13 +464,13 @@ class Parse:
         :rtype: None
         """
         length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
+        name = self._get_string(length)
         amount = self._get_number_int_unsigned()
 
         self.message += f'  |-> Item Recollected\n'
         self.message += f'    |-> Name: {name}\n'
         self.message += f'    |-> Amount: {amount}\n'
+        self._event('item_recollection', name=name, amount=amount)
 
     def _server_character_events(self) -> None:
         """
@@ -394,8 +480,7 @@ class Parse:
         """
         idx = self._get_number_int_unsigned()
         length = self._get_number_short_unsigned()
-        name = str(self.data[:length], 'UTF-8')
-        self._get_data(length)
+        name = self._get_string(length)
         data = self.data[:4]
         value = self._get_number_int_unsigned()
 
@@ -403,6 +488,7 @@ class Parse:
         self.message += f'    |-> Character: {idx}\n'
         self.message += f'    |-> Event: {name}\n'
         self.message += f'    |-> Unknown #1: {data.hex()} = {value}\n'
+        self._event('character_event', actor=idx, event=name, value=value)
 
     def client(self, port: int) -> None:
         """
@@ -428,6 +514,7 @@ class Parse:
             791: self._general_constant_information,  # 0x1703
         }
 
+        self.port = port
         self.message += f'Client -> Server [{port}]: {datetime.now()}\n'
         self._parse(ids)
 
@@ -440,6 +527,7 @@ class Parse:
 
         :rtype: None
         """
+        self.port = port
         self.data = self.data[:-2]
         self.data_original = self.data_original[:-2]
         if len(self.data) == 0:
@@ -468,6 +556,28 @@ class Parse:
         self.message += f'Server -> Client [{port}]: {datetime.now()}\n'
         self._parse(ids)
 
+    def _unknown(self, unknown_data: bytearray, dropped: int) -> None:
+        """
+        Display the data of a region which is not discovered yet. It is truncated to the memory limit of the unknown
+        data.
+
+        :type unknown_data: bytearray
+        :param unknown_data: Raw data of the region.
+
+        :type dropped: int
+        :param dropped: Number of bytes over the limit which were not kept.
+
+        :rtype: None
+        """
+        if not self.live:
+            self.unknown.append((bytes(unknown_data), len(unknown_data) + dropped))
+        self.message += f'|-> Unknown ---> Hex: {unknown_data.hex()}\n'
+        self.message += f'|-> Unknown ---> Raw: {unknown_data}\n'
+        if dropped:
+            self.message += f'|-> Unknown ---> Truncated: {dropped} bytes\n'
+            Memory.shed('unknown', dropped)
+        self.message += f'|-> -----------------\n'
+
     def _parse(self, ids: dict) -> None:
         """
         Start to parse the data.
@@ -479,6 +589,8 @@ class Parse:
         """
         is_unknown = False
         unknown_data = bytearray()
+        unknown_limit = Memory.limit('unknown')
+        unknown_dropped = 0
 
         while len(self.data) > 1:
             packet_id, = unpack('<H', self.data[:2])
@@ -486,33 +598,36 @@ class Parse:
             if packet_id not in ids:
                 is_unknown = True
                 self.should_display_message = True
-                unknown_data += self.data[:1]
+                size = 2 if len(self.data) == 2 else 1
+                if unknown_limit and len(unknown_data) + size > unknown_limit:
+                    unknown_dropped += size
+                else:
+                    unknown_data += self.data[:size]
                 self.data = self.data[1:]
-                if len(self.data) == 1:
-                    unknown_data += self.data
                 continue
 
             if is_unknown:
                 is_unknown = False
                 self.show_data = True
-                self.message += f'|-> Unknown ---> Hex: {unknown_data.hex()}\n'
-                self.message += f'|-> Unknown ---> Raw: {unknown_data}\n'
-                self.message += f'|-> -----------------\n'
+                self._unknown(unknown_data, unknown_dropped)
                 unknown_data = bytearray()
+                unknown_dropped = 0
 
+            size = len(self.data)
             packet_id = self._get_number_short_unsigned()
             ids.get(packet_id)()
+            if not self.live:
+                self.opcodes.append((packet_id, size - len(self.data)))
 
         if is_unknown:
             self.show_data = True
-            self.message += f'|-> Unknown ---> Hex: {unknown_data.hex()}\n'
-            self.message += f'|-> Unknown ---> Raw: {unknown_data}\n'
-            self.message += f'|-> -----------------\n'
+            self._unknown(unknown_data, unknown_dropped)
 
-        if self.should_display_message and len(self.message) > 20:
+        if self.live and self.should_display_message and len(self.message) > 20:
             if self.show_data:
-                self.message += f'|-> Hex: {self.data_original.hex()}\n'
-                self.message += f'|-> Raw: {self.data_original}\n'
+                original = self.data_original[:unknown_limit] if unknown_limit else self.data_original
+                self.message += f'|-> Hex: {original.hex()}\n'
+                self.message += f'|-> Raw: {bytes(original)}\n'
             self.show_data = False
             print(self.message)
             debug(self.message)
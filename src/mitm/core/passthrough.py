@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Create a singleton class to keep the ports which relay the packages without inspection.
+"""
+
+
+class Passthrough:
+    """
+    Keep the ports in pass-through mode. The packages of these ports are not injected or parsed, they are relayed in
+    kernel space with splice when it is available.
+    """
+    PORTS = set()
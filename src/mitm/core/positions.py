@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Decode the position packages in batches. The parser only copies the fixed layout records in a window and when it is
+full or its oldest record waited the maximum delay, all of them are decoded at once in a structured NumPy array. The
+velocity, the speed and the teleports are calculated in vectorized form, so the speed hack detection and the analysis of
+the paths run on every position update. The decoded window is handed to the trajectories, the export and the capture,
+which receive the live positions only from here, and the last state of every actor is kept for the control API.
+"""
+from array import array
+from logging import debug
+from threading import Lock
+
+from core.capture import Capture
+from core.export import Export
+from core.trajectory import Trajectory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Positions:
+    """
+    Window of position records of one port.
+    """
+    ACTIVE = {}
+    NO_ACTOR = b'\x00\x00\x00\x00'
+
+    def __init__(self, port: int, window: int = 256, teleport_speed: float = 5000.0, forget: float = 10.0,
+                 max_delay: float = 0.1) -> None:
+        """
+        Constructor which init the class.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type window: int
+        :param window: Number of records which are decoded together.
+
+        :type teleport_speed: float
+        :param teleport_speed: Units per second from which a movement is flagged as teleport.
+
+        :type forget: float
+        :param forget: Seconds after which the last position of an actor is not used for the velocity.
+
+        :type max_delay: float
+        :param max_delay: Seconds that a record waits in a window which is not full, so the predictions are recent.
+
+        :rtype: Positions
+        :return: The object instanced of this class.
+        """
+        self.port = port
+        self.window = window
+        self.teleport_speed = teleport_speed
+        self.forget = forget
+        self.max_delay = max_delay
+        self.records = 0
+        self.windows = 0
+        self.teleports = 0
+        self.last = None
+        self._raw = bytearray()
+        self._times = array('d')
+        self._carry = None
+        self._lock = Lock()
+
+    @staticmethod
+    def get(port: int) -> 'Positions':
+        """
+        Get the window of the port, it is created the first time.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Positions
+        :return: The window of the port.
+        """
+        positions = Positions.ACTIVE.get(port)
+        if positions is None:
+            positions = Positions.ACTIVE.setdefault(port, Positions(port))
+        return positions
+
+    @staticmethod
+    def dtype() -> object:
+        """
+        Layout of the record: actor ID, position, view, view limit, direction and the second ID.
+
+        :rtype: numpy.dtype
+        :return: The record type.
+        """
+        return numpy.dtype([
+            ('actor', '<u4'), ('x', '<f4'), ('y', '<f4'), ('z', '<f4'), ('view', 'V4'), ('view_limit', '<i2'),
+            ('dy', 'i1'), ('dx', 'i1'), ('actor_2', '<u4'),
+        ])
+
+    def add_client(self, timestamp: float, record: memoryview) -> None:
+        """
+        Add the position of your player sent by the client. It has no IDs, so the actor is zero.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type record: memoryview
+        :param record: The 20 bytes of the position.
+
+        :rtype: bool
+        :return: True if the record is decoded in the window, False without NumPy.
+        """
+        if numpy is None:
+            return False
+        with self._lock:
+            self._raw += self.NO_ACTOR
+            self._raw += record
+            self._raw += self.NO_ACTOR
+            self._append(timestamp)
+        return True
+
+    def add_character(self, timestamp: float, record: memoryview) -> bool:
+        """
+        Add the position of a character sent by the server.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type record: memoryview
+        :param record: The 28 bytes of the ID, the position and the second ID.
+
+        :rtype: bool
+        :return: True if the record is decoded in the window, False without NumPy.
+        """
+        if numpy is None:
+            return False
+        with self._lock:
+            self._raw += record
+            self._append(timestamp)
+        return True
+
+    def flush(self) -> object:
+        """
+        Decode the records of the window even if it is not full.
+
+        :rtype: numpy.ndarray
+        :return: The decoded window, None if it is empty.
+        """
+        if numpy is None:
+            return None
+        with self._lock:
+            return self._decode()
+
+    def stats(self) -> dict:
+        """
+        Describe the decoder for the control API.
+
+        :rtype: dict
+        :return: The number of records, windows and teleports.
+        """
+        return {'port': self.port, 'records': self.records, 'windows': self.windows, 'teleports': self.teleports,
+                'pending': len(self._times)}
+
+    def actors(self) -> list:
+        """
+        Get the last state of every actor of the last window, e.g. to find the actors which move too fast.
+
+        :rtype: list
+        :return: The time, position, velocity, speed and teleport flag of every actor, the fastest first.
+        """
+        with self._lock:
+            last = self.last
+        if last is None or not len(last):
+            return []
+        # The last record of every actor is the first one of the reversed window
+        actors, index = numpy.unique(last['actor'][::-1], return_index=True)
+        rows = last[len(last) - 1 - index]
+        rows = rows[numpy.argsort(-rows['speed'])]
+        return [{key: row[key].item() for key in rows.dtype.names} for row in rows]
+
+    def _append(self, timestamp: float) -> None:
+        """
+        Count the record and decode the window when it is full. The lock must be taken.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :rtype: None
+        """
+        self._times.append(timestamp)
+        self.records += 1
+        if len(self._times) >= self.window or timestamp - self._times[0] >= self.max_delay:
+            self._decode()
+
+    def _decode(self) -> object:
+        """
+        Decode the window and calculate the velocity, the speed and the teleport flag of every record. The last record
+        of every actor is kept for the next window. The lock must be taken.
+
+        :rtype: numpy.ndarray
+        :return: The decoded window, None if it is empty.
+        """
+        if not self._times:
+            return None
+
+        records = numpy.frombuffer(self._raw, dtype=self.dtype())
+        times = numpy.frombuffer(self._times, dtype='<f8')
+        self._raw = bytearray()
+        self._times = array('d')
+
+        size = len(records)
+        actor = records['actor']
+        position = numpy.stack((records['x'], records['y'], records['z']), axis=1).astype('f8')
+        if self._carry is not None:
+            carry_actor, carry_time, carry_position = self._carry
+            actor = numpy.concatenate((carry_actor, actor))
+            times = numpy.concatenate((carry_time, times))
+            position = numpy.concatenate((carry_position, position))
+        first = len(actor) - size
+
+        order = numpy.lexsort((times, actor))
+        sorted_actor = actor[order]
+        sorted_time = times[order]
+        sorted_position = position[order]
+
+        same = numpy.zeros(len(order), dtype=bool)
+        same[1:] = sorted_actor[1:] == sorted_actor[:-1]
+        delta_time = numpy.zeros(len(order))
+        delta_time[1:] = sorted_time[1:] - sorted_time[:-1]
+        delta_position = numpy.zeros_like(sorted_position)
+        delta_position[1:] = sorted_position[1:] - sorted_position[:-1]
+        valid = same & (delta_time > 0) & (delta_time < self.forget)
+
+        velocity = numpy.zeros_like(sorted_position)
+        velocity[valid] = delta_position[valid] / delta_time[valid, None]
+        speed = numpy.linalg.norm(velocity, axis=1)
+        teleport = valid & (speed > self.teleport_speed)
+
+        last = numpy.ones(len(order), dtype=bool)
+        last[:-1] = sorted_actor[1:] != sorted_actor[:-1]
+        recent = last & (sorted_time > sorted_time.max() - self.forget)
+        self._carry = (sorted_actor[recent], sorted_time[recent], sorted_position[recent])
+
+        result = numpy.zeros(size, dtype=[
+            ('time', '<f8'), ('actor', '<u4'), ('x', '<f8'), ('y', '<f8'), ('z', '<f8'), ('vx', '<f8'), ('vy', '<f8'),
+            ('vz', '<f8'), ('speed', '<f8'), ('teleport', '?'),
+        ])
+        window = order >= first
+        result_index = order[window] - first
+        result['time'][result_index] = sorted_time[window]
+        result['actor'][result_index] = sorted_actor[window]
+        result['x'][result_index], result['y'][result_index], result['z'][result_index] = sorted_position[window].T
+        result['vx'][result_index], result['vy'][result_index], result['vz'][result_index] = velocity[window].T
+        result['speed'][result_index] = speed[window]
+        result['teleport'][result_index] = teleport[window]
+
+        self.windows += 1
+        flagged = int(result['teleport'].sum())
+        if flagged:
+            self.teleports += flagged
+            for row in result[result['teleport']]:
+                message = f'*** Position [{self.port}]: Teleport of actor {row["actor"]} to ' \
+                          f'{row["x"]:10.2f} X | {row["y"]:10.2f} Y | {row["z"]:10.2f} Z | Speed {row["speed"]:.2f}'
+                debug(message)
+        self.last = result
+        self._publish(result)
+        return result
+
+    def _publish(self, result: object) -> None:
+        """
+        Hand the decoded window to the trajectories, the export and the world of the capture. The lock must be taken.
+
+        :type result: numpy.ndarray
+        :param result: The decoded window.
+
+        :rtype: None
+        """
+        trajectory = Trajectory.get(self.port)
+        if trajectory is not None:
+            trajectory.extend(result['actor'], result['time'], result['x'], result['y'], result['z'])
+        if Export.ACTIVE is not None:
+            Export.ACTIVE.extend(self.port, 'position', {name: result[name].tolist() for name in result.dtype.names})
+        if Capture.ACTIVE is not None:
+            Capture.ACTIVE.positions(self.port, result['actor'].tolist(), result['time'].tolist(),
+                                     result['x'].tolist(), result['y'].tolist(), result['z'].tolist())
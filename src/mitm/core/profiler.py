@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Sampling profiler of the relay threads. While it is running, a thread takes the stacks of the threads which relay the
+packages at a fixed interval and counts them per port from Package.start down, so Inject.run and Parse._parse are seen
+under the real traffic. The stacks are written in the collapsed format of the flame graphs. When it is stopped there is
+nothing in the hot path, so it does not cost anything.
+"""
+from collections import Counter
+from os import makedirs, path
+from sys import _current_frames
+from threading import Thread, Event, Lock, enumerate as threading_enumerate
+
+
+class Profiler(Thread):
+    """
+    Take samples of the stacks of the relay threads.
+    """
+    ACTIVE = None
+    ROOT = ('package.py', 'start')
+
+    def __init__(self, interval: float = 0.005) -> None:
+        """
+        Constructor which init the class.
+
+        :type interval: float
+        :param interval: Seconds between two samples.
+
+        :rtype: Profiler
+        :return: The object instanced of this class.
+        """
+        super(Profiler, self).__init__()
+        self.name = 'Profiler'
+        self.daemon = True
+        self.interval = interval
+        self.samples = 0
+        self.stacks = {}
+        self._labels = {}
+        self._lock = Lock()
+        self._stopped = Event()
+
+    def terminate(self) -> None:
+        """
+        Stop to take samples. The stacks are kept until they are written.
+
+        :rtype: None
+        """
+        self._stopped.set()
+        self.join()
+
+    def run(self) -> None:
+        """
+        Take a sample every interval.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while not self._stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self) -> None:
+        """
+        Count the current stack of every relay thread.
+
+        :rtype: None
+        """
+        ports = {thread.ident: thread.port for thread in threading_enumerate()
+                 if getattr(thread, 'package', None) is not None}
+        frames = _current_frames()
+        with self._lock:
+            for ident, port in ports.items():
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                stack = self._collapse(frame)
+                if stack:
+                    self.stacks.setdefault(port, Counter())[stack] += 1
+            self.samples += 1
+
+    def _collapse(self, frame: object) -> str:
+        """
+        Join the functions of the stack from Package.start to the current one.
+
+        :type frame: frame
+        :param frame: The current frame of the thread.
+
+        :rtype: str
+        :return: The functions separated by semicolons, empty when the thread is not relaying.
+        """
+        labels = []
+        while frame is not None:
+            code = frame.f_code
+            label = self._labels.get(code)
+            if label is None:
+                module = path.splitext(path.basename(code.co_filename))[0]
+                label = self._labels[code] = f'{module}.{getattr(code, "co_qualname", code.co_name)}'
+            labels.append(label)
+            if (path.basename(code.co_filename), code.co_name) == self.ROOT:
+                labels.reverse()
+                return ';'.join(labels)
+            frame = frame.f_back
+        return ''
+
+    def stats(self, top: int = 5) -> dict:
+        """
+        Describe the profile for the control API.
+
+        :type top: int
+        :param top: Number of the hottest functions of every port.
+
+        :rtype: dict
+        :return: The samples and the functions with most samples of every port.
+        """
+        with self._lock:
+            ports = []
+            for port, stacks in sorted(self.stacks.items()):
+                leaves = Counter()
+                for stack, samples in stacks.items():
+                    leaves[stack.rsplit(';', 1)[-1]] += samples
+                ports.append({'port': port, 'samples': sum(stacks.values()), 'top': leaves.most_common(top)})
+        return {'running': self.is_alive(), 'interval': self.interval, 'samples': self.samples, 'ports': ports}
+
+    def dump(self, directory: str) -> list:
+        """
+        Write the collapsed stacks of every port, e.g. for flamegraph.pl or speedscope.
+
+        :type directory: str
+        :param directory: The folder of the files.
+
+        :rtype: list
+        :return: The files which were written.
+        """
+        makedirs(directory, exist_ok=True)
+        files = []
+        with self._lock:
+            for port, stacks in sorted(self.stacks.items()):
+                filename = path.join(directory, f'profile-{port}.folded')
+                with open(filename, 'w') as file:
+                    for stack, samples in stacks.most_common():
+                        file.write(f'{stack} {samples}\n')
+                files.append(filename)
+        return files
@@ -7,11 +7,15 @@ server. Also it is running in threads to improve the performance and catch all t
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from logging import basicConfig, DEBUG
-from threading import Thread
+from socket import socket, AF_INET, SOCK_STREAM, SOL_SOCKET, SO_REUSEADDR, SHUT_RDWR
+from sys import modules
+from threading import Thread, Lock
 
 from core.client_to_server import ClientToServer
+from core.router import Router
 from core.server_to_client import ServerToClient
+from core.session import Session
+from core.tuning import Tuning
 
 
 class Proxy(Thread):
@@ -19,30 +23,60 @@ class Proxy(Thread):
     Start the communication between both, the client and server.
     """
 
-    def __init__(self, from_host: str, to_host: str, port: int) -> None:
+    def __init__(self, from_host: str, port: int, router: Router) -> None:
         """
         Constructor which init the class.
 
         :type from_host: str
         :param from_host: The IP which is received by the client. Zeros means any IP (0.0.0.0)
 
-        :type to_host: str
-        :param to_host: The IP which is send to the Server.
-
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type router: Router
+        :param router: The routing table which choose the server and provides the connections.
+
         :rtype: Proxy
         :return: The object instanced of this class.
         """
         super(Proxy, self).__init__()
         self.name = f'Proxy [{port}]'
         self.from_host = from_host
-        self.to_host = to_host
         self.port = port
-        self.running = False
+        self.router = router
+        self.sessions = set()
+        self.listener = None
+        self._lock = Lock()
         self._running = True
-        basicConfig(filename='./debug.log', filemode='w', level=DEBUG, format='%(message)s')
+
+    def bind(self) -> None:
+        """
+        Open the listener, so the clients are queued by the kernel even before the thread accepts them.
+
+        :rtype: None
+        """
+        self.listener = socket(AF_INET, SOCK_STREAM)
+        self.listener.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self.listener.bind((self.from_host, self.port))
+        self.listener.listen(1)
+
+    def terminate(self) -> None:
+        """
+        Stop to accept clients and close the current sessions.
+
+        :rtype: None
+        """
+        self._running = False
+        if self.listener is not None:
+            try:
+                self.listener.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+            self.listener.close()
+        with self._lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            self.close_session(session)
 
     def run(self) -> None:
         """
@@ -51,27 +85,54 @@ class Proxy(Thread):
 
         :rtype: None
         """
-        connection_thread = []
+        learn = self.port == self.router.master_port
+        if self.listener is None:
+            self.bind()
+
         while self._running:
             print(f'Proxy [{self.port}]: Setting up')
-            client_to_server = ClientToServer(self.from_host, self.port)
-            server_to_client = ServerToClient(self.to_host, self.port)
+            try:
+                # Waiting for a connection
+                client, addr = self.listener.accept()
+            except OSError:
+                break
+
+            try:
+                to_host, server = self.router.connect(self.port)
+            except OSError as e:
+                print(f'Proxy [{self.port}]: Server not available ---> {e}')
+                client.close()
+                continue
 
-            print(f'Proxy [{self.port}]: Connection established')
+            print(f'Proxy [{self.port}]: Connection established with {to_host}')
+            Tuning.apply(client, self.port)
+            Tuning.apply(server, self.port)
+            client_to_server = ClientToServer(client, self.port)
+            server_to_client = ServerToClient(server, self.port, self.router if learn else None)
             client_to_server.server = server_to_client.server
             server_to_client.client = client_to_server.client
-            self.running = True
 
-            if connection_thread:
-                client_thread, server_thread = connection_thread.pop(0)
-                client_thread.terminate()
-                server_thread.terminate()
+            # Every client keeps its own session, so the clients of the port are balanced between the servers
+            session = Session(self.port, to_host, client_to_server, server_to_client, self.close_session)
+            with self._lock:
+                self.sessions.add(session)
+            session.start()
 
-            client_to_server.start()
-            server_to_client.start()
-            connection_thread.append((client_to_server, server_to_client))
+    def close_session(self, session: Session) -> None:
+        """
+        Stop a connection and discount it from the routing table, e.g. a finished session. When it is the last session
+        of the port the actors of its trajectories are forgotten, they are only loaded by the parser.
+
+        :type session: Session
+        :param session: The connection of a client.
 
-        if connection_thread:
-            client_thread, server_thread = connection_thread.pop(0)
-            client_thread.terminate()
-            server_thread.terminate()
+        :rtype: None
+        """
+        if session.close():
+            self.router.release(session.to_host, self.port)
+            with self._lock:
+                self.sessions.discard(session)
+                last = not self.sessions
+            trajectory = modules.get('core.trajectory')
+            if last and trajectory is not None:
+                trajectory.Trajectory.close(self.port)
@@ -1,14 +1,138 @@
 #!/usr/bin/env python3
 # -*- coding: UTF-8 -*-
 """
-Create a singleton class to keep the references of the Queue list of packages.
+Create a singleton class to keep the references of the Queue list of packages. The queues are limited in bytes, when
+the limit is reached the oldest packages are dropped.
 """
+from collections import deque
+from threading import Lock
+
+from core.memory import Memory
+
+
+class Packets(deque):
+    """
+    Queue of packages limited in bytes by the memory limit of its subsystem.
+    """
+
+    def __init__(self, subsystem: str) -> None:
+        """
+        Constructor which init the class.
+
+        :type subsystem: str
+        :param subsystem: Name of the memory limit of the queue.
+
+        :rtype: Packets
+        :return: The object instanced of this class.
+        """
+        super(Packets, self).__init__()
+        self.subsystem = subsystem
+        self.bytes = 0
+        self._lock = Lock()
+
+    def append(self, item: object) -> None:
+        """
+        Add an entry at the end. The oldest entries are dropped while the queue is over its limit, but the new entry is
+        always kept.
+
+        :type item: object
+        :param item: Raw package or hack.
+
+        :rtype: None
+        """
+        size = Memory.size(item)
+        with self._lock:
+            super(Packets, self).append(item)
+            self.bytes += size
+            limit = Memory.limit(self.subsystem)
+            dropped = 0
+            while limit and self.bytes > limit and len(self) > 1:
+                removed = Memory.size(super(Packets, self).popleft())
+                self.bytes -= removed
+                dropped += removed
+        if dropped:
+            Memory.shed(self.subsystem, dropped)
+
+    def popleft(self) -> object:
+        """
+        Remove and return the oldest entry.
+
+        :rtype: object
+        :return: Raw package or hack.
+        """
+        with self._lock:
+            item = super(Packets, self).popleft()
+            self.bytes -= Memory.size(item)
+        return item
+
+    def shed(self) -> int:
+        """
+        Drop all the entries.
+
+        :rtype: int
+        :return: The number of bytes dropped.
+        """
+        with self._lock:
+            dropped = self.bytes
+            self.clear()
+            self.bytes = 0
+        if dropped:
+            Memory.shed(self.subsystem, dropped)
+        return dropped
 
 
 class Queue:
     """
-    Keep the Queue of the packages.
+    Keep the Queue of the packages for every port.
     """
-    SERVER_QUEUE = []
-    CLIENT_QUEUE = []
-    HACKS = []
+    SERVER_QUEUE = {}
+    CLIENT_QUEUE = {}
+    HACKS = {}
+
+    @staticmethod
+    def server(port: int) -> deque:
+        """
+        Get the packages which will be sent to the server of the port.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Packets
+        :return: The queue of the port.
+        """
+        queue = Queue.SERVER_QUEUE.get(port)
+        if queue is None:
+            queue = Queue.SERVER_QUEUE.setdefault(port, Packets('queue'))
+        return queue
+
+    @staticmethod
+    def client(port: int) -> deque:
+        """
+        Get the packages which will be sent to the client of the port.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Packets
+        :return: The queue of the port.
+        """
+        queue = Queue.CLIENT_QUEUE.get(port)
+        if queue is None:
+            queue = Queue.CLIENT_QUEUE.setdefault(port, Packets('queue'))
+        return queue
+
+    @staticmethod
+    def hacks(port: int) -> deque:
+        """
+        Get the hacks which will be executed in the port.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Packets
+        :return: The queue of the port.
+        """
+        queue = Queue.HACKS.get(port)
+        if queue is None:
+            queue = Queue.HACKS.setdefault(port, Packets('hacks'))
+        return queue
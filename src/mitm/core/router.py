@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Routing table between the ports which the proxy listens and the game servers. The routes are learned from the traffic
+of the master server, so when new game containers are started the proxy opens the listeners on demand and balance the
+clients with the least connections.
+"""
+from re import compile as re_compile
+from struct import unpack_from
+from threading import Lock
+
+from core.upstream import Upstream
+
+
+class Router:
+    """
+    Keep the game servers for every port and the listeners which are running.
+    """
+
+    HOSTNAME = re_compile(rb'^[A-Za-z0-9][A-Za-z0-9.-]*\.[A-Za-z0-9.-]*[A-Za-z0-9]$')
+
+    def __init__(self, from_host: str, master_port: int, upstream: Upstream, ports: range = range(3000, 3100)) -> None:
+        """
+        Constructor which init the class.
+
+        :type from_host: str
+        :param from_host: The IP which is received by the client. Zeros means any IP (0.0.0.0)
+
+        :type master_port: int
+        :param master_port: The number of the port of the master server. Its traffic is used to learn the routes.
+
+        :type upstream: Upstream
+        :param upstream: The pool which provides the connections to the server.
+
+        :type ports: range
+        :param ports: The ports which could be learned as game servers.
+
+        :rtype: Router
+        :return: The object instanced of this class.
+        """
+        self.from_host = from_host
+        self.master_port = master_port
+        self.upstream = upstream
+        self.ports = ports
+        self.routes = {}
+        self.listeners = {}
+        self._lock = Lock()
+
+    def add(self, host: str, port: int, start: bool = True) -> bool:
+        """
+        Add a server to the routing table and open the listener of its port if it is not running yet.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type start: bool
+        :param start: False to only bind the listener, the clients wait in the backlog until start is called.
+
+        :rtype: bool
+        :return: True if the route is new.
+        """
+        from core.proxy import Proxy
+
+        with self._lock:
+            servers = self.routes.setdefault(port, {})
+            if host in servers:
+                return False
+            servers[host] = 0
+            listener = self.listeners.get(port)
+            if listener is None:
+                listener = Proxy(self.from_host, port, self)
+                self.listeners[port] = listener
+
+        if not listener.is_alive() and listener.listener is None:
+            try:
+                listener.bind()
+            except OSError as e:
+                print(f'Router [{port}]: Listener not available ---> {e}')
+                with self._lock:
+                    self.listeners.pop(port, None)
+                    servers.pop(host, None)
+                    if not servers:
+                        self.routes.pop(port, None)
+                return False
+
+        print(f'Router [{port}]: Route to {host}')
+        if port != self.master_port:
+            self.upstream.watch(host, port)
+        if start and not listener.is_alive():
+            listener.start()
+        return True
+
+    def start(self) -> None:
+        """
+        Start to accept the clients in the listeners which were only bound.
+
+        :rtype: None
+        """
+        with self._lock:
+            listeners = list(self.listeners.values())
+        for listener in listeners:
+            if not listener.is_alive():
+                listener.start()
+
+    def select(self, port: int) -> str:
+        """
+        Choose the server of this port with the least connections and count the new connection.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: str
+        :return: The server's IP.
+        """
+        with self._lock:
+            servers = self.routes[port]
+            host = min(servers, key=servers.get)
+            servers[host] += 1
+        return host
+
+    def release(self, host: str, port: int) -> None:
+        """
+        Discount the connection when the client is disconnected.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: None
+        """
+        with self._lock:
+            servers = self.routes.get(port, {})
+            if servers.get(host, 0) > 0:
+                servers[host] -= 1
+
+    def connect(self, port: int) -> tuple:
+        """
+        Take a connection to the server with the least connections of this port.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: tuple
+        :return: The server's IP and the connection established with it.
+        """
+        host = self.select(port)
+        try:
+            return host, self.upstream.acquire(host, port)
+        except OSError:
+            self.release(host, port)
+            raise
+
+    def learn(self, data: bytes) -> None:
+        """
+        Find the game servers announced by the master server. The address is sent as a short unsigned length, the
+        host name and the port as short unsigned.
+
+        :type data: bytes
+        :param data: Raw data from the master server.
+
+        :rtype: None
+        """
+        end = len(data) - 4
+        idx = 0
+        while idx < end:
+            length, = unpack_from('<H', data, idx)
+            if 3 < length < 254 and idx + 2 + length + 2 <= len(data):
+                host = bytes(data[idx + 2:idx + 2 + length])
+                port, = unpack_from('<H', data, idx + 2 + length)
+                if port in self.ports and self.HOSTNAME.match(host):
+                    self.add(host.decode('ascii'), port)
+                    idx += 2 + length + 2
+                    continue
+            idx += 1
+
+    def table(self) -> list:
+        """
+        Get the routing table.
+
+        :rtype: list
+        :return: The port, server, connections and if a client is connected for every route.
+        """
+        table = []
+        with self._lock:
+            for port, servers in sorted(self.routes.items()):
+                listener = self.listeners.get(port)
+                running = listener is not None and bool(listener.sessions)
+                for host, connections in servers.items():
+                    table.append({'port': port, 'host': host, 'connections': connections, 'client': running})
+        return table
+
+    def terminate(self) -> None:
+        """
+        Stop all the listeners and their sessions.
+
+        :rtype: None
+        """
+        with self._lock:
+            listeners = list(self.listeners.values())
+        for listener in listeners:
+            listener.terminate()
@@ -6,10 +6,11 @@ Manage the connection from the Server to the Client.
 This code is partially taken bye LiveOverflow/PwnAdventure3 (https://github.com/LiveOverflow/PwnAdventure3) under the
 GPL-3.0 License
 """
-from socket import socket, AF_INET, SOCK_STREAM
+from socket import socket
 from threading import Thread
 
 from core.package import Package
+from core.router import Router
 
 
 class ServerToClient(Thread):
@@ -17,16 +18,19 @@ class ServerToClient(Thread):
     Get, analyze and modify the data from server and send to the client.
     """
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, server: socket, port: int, router: Router = None) -> None:
         """
         Constructor which init the class.
 
-        :type host: str
-        :param host: The server's IP.
+        :type server: socket
+        :param server: The connection already established with the server.
 
         :type port: int
         :param port: The number of the port for the communication.
 
+        :type router: Router
+        :param router: The routing table which learns the game servers from this traffic. None means no learning.
+
         :rtype: ServerToClient
         :return: The object instanced of this class.
         """
@@ -35,9 +39,10 @@ class ServerToClient(Thread):
         self._running = True
         self.client = None
         self.port = port
-        self.server = socket(AF_INET, SOCK_STREAM)
-        self.server.connect((host, port))
+        self.router = router
+        self.server = server
         self.package = None
+        self.session = None
 
     def terminate(self) -> None:
         """
@@ -45,7 +50,8 @@ class ServerToClient(Thread):
 
         :rtype: None
         """
-        self.package.terminate()
+        if self.package is not None:
+            self.package.terminate()
 
     def run(self) -> None:
         """
@@ -54,5 +60,9 @@ class ServerToClient(Thread):
 
         :rtype: None
         """
-        self.package = Package(True, self.server, self.client, self.port)
-        self.package.start()
+        try:
+            self.package = Package(True, self.server, self.client, self.port, self.router)
+            self.package.start()
+        finally:
+            if self.session is not None:
+                self.session.finished()
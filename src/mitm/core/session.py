@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Keep the pair of threads of one client connected through the proxy. Every session has a unique ID, so the commands of
+the control API could target a specific connection.
+"""
+from datetime import datetime
+from itertools import count
+from socket import SHUT_RDWR
+from threading import Lock
+
+from core.client_to_server import ClientToServer
+from core.server_to_client import ServerToClient
+
+
+class Session:
+    """
+    One client connected to the server through the proxy.
+    """
+    COUNTER = count(1)
+    ACTIVE = {}
+
+    def __init__(self, port: int, to_host: str, client_to_server: ClientToServer,
+                 server_to_client: ServerToClient, on_close: callable = None) -> None:
+        """
+        Constructor which init the class.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type to_host: str
+        :param to_host: The server's IP.
+
+        :type client_to_server: ClientToServer
+        :param client_to_server: The thread which send the packages from the client.
+
+        :type server_to_client: ServerToClient
+        :param server_to_client: The thread which send the packages from the server.
+
+        :type on_close: callable
+        :param on_close: Called with the session when both threads are finished, e.g. to release its connection.
+
+        :rtype: Session
+        :return: The object instanced of this class.
+        """
+        self.idx = next(Session.COUNTER)
+        self.port = port
+        self.to_host = to_host
+        self.client_to_server = client_to_server
+        self.server_to_client = server_to_client
+        self.on_close = on_close
+        self.started = datetime.now()
+        self._running = 2
+        self._lock = Lock()
+        client_to_server.session = self
+        server_to_client.session = self
+        Session.ACTIVE[self.idx] = self
+
+    def start(self) -> None:
+        """
+        Start to relay the packages in both directions.
+
+        :rtype: None
+        """
+        self.client_to_server.start()
+        self.server_to_client.start()
+
+    def finished(self) -> None:
+        """
+        Count a thread which stopped relaying. When the client disconnects both threads stop and the session is torn
+        down, so its connection is released without waiting for the memory watchdog.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._running -= 1
+            last = self._running == 0
+        if last and self.on_close is not None:
+            self.on_close(self)
+
+    def send(self, destination: str, packet: bytes) -> None:
+        """
+        Send a package immediately, without waiting for the traffic of the connection.
+
+        :type destination: str
+        :param destination: It refers to the network target could be client or server.
+
+        :type packet: bytes
+        :param packet: Raw package.
+
+        :rtype: None
+        """
+        thread = self.client_to_server if destination == 'server' else self.server_to_client
+        if thread.package is None:
+            raise RuntimeError(f'Session #{self.idx} is not relaying yet')
+        thread.package.send(packet)
+
+    def close(self) -> bool:
+        """
+        Stop both threads and close the sockets, so the blocked receives return immediately.
+
+        :rtype: bool
+        :return: False if the session was already closed.
+        """
+        if Session.ACTIVE.pop(self.idx, None) is None:
+            return False
+        for thread in (self.client_to_server, self.server_to_client):
+            if thread.package is not None:
+                thread.package.terminate()
+        for connection in (self.client_to_server.client, self.server_to_client.server):
+            try:
+                connection.shutdown(SHUT_RDWR)
+            except OSError:
+                pass
+        return True
+
+    def info(self) -> dict:
+        """
+        Describe the session for the control API.
+
+        :rtype: dict
+        :return: The ID, port, server and start time of the session.
+        """
+        return {
+            'session': self.idx,
+            'port': self.port,
+            'host': self.to_host,
+            'started': self.started.isoformat(),
+        }
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Measure the boot of the proxy. Every stage is timed from the end of the previous one and the time before main, the
+start of the interpreter and the imports, is read from the kernel, so a restart during the game could be profiled.
+"""
+from os import sysconf
+from time import perf_counter
+
+
+class Startup:
+    """
+    Time of every stage of the boot.
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        """
+        Constructor which init the class.
+
+        :type enabled: bool
+        :param enabled: False to skip the report.
+
+        :rtype: Startup
+        :return: The object instanced of this class.
+        """
+        self.enabled = enabled
+        self.before = self.process_age()
+        self.stages = []
+        self._begin = self._last = perf_counter()
+
+    @staticmethod
+    def process_age() -> float:
+        """
+        Get the seconds since the process was started.
+
+        :rtype: float
+        :return: The age of the process, zero when it is not available.
+        """
+        try:
+            with open('/proc/self/stat') as stat:
+                started = int(stat.read().rsplit(')', 1)[1].split()[19]) / sysconf('SC_CLK_TCK')
+            with open('/proc/uptime') as uptime:
+                return max(float(uptime.read().split()[0]) - started, 0.0)
+        except (OSError, ValueError, IndexError):
+            return 0.0
+
+    def mark(self, stage: str) -> None:
+        """
+        Finish a stage of the boot.
+
+        :type stage: str
+        :param stage: Name of the stage.
+
+        :rtype: None
+        """
+        now = perf_counter()
+        self.stages.append((stage, now - self._last))
+        self._last = now
+
+    def report(self) -> None:
+        """
+        Print the time of every stage.
+
+        :rtype: None
+        """
+        if not self.enabled:
+            return
+        print(f'| {"Interpreter and imports":>25} | {self.before * 1000:10.1f} ms |')
+        for stage, elapsed in self.stages:
+            print(f'| {stage:>25} | {elapsed * 1000:10.1f} ms |')
+        print(f'| {"Total":>25} | {(self.before + self._last - self._begin) * 1000:10.1f} ms |')
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Cache of the names decoded by the parser. The same few hundred names of drops, weapons, ammo and actions are repeated in
+every package, so the raw bytes are decoded only once and the same interned str is returned after. The cache is a
+bounded LRU which is kept in this module, it is not reloaded with the parser, so it is shared by all the sessions. The
+hits do not take the lock, only the misses which insert and evict the names.
+"""
+from collections import OrderedDict
+from sys import intern
+from threading import Lock
+
+
+class Strings:
+    """
+    LRU cache from the raw bytes to the interned str.
+    """
+    SIZE = 1024
+    CACHE = OrderedDict()
+    hits = 0
+    misses = 0
+    _lock = Lock()
+
+    @staticmethod
+    def decode(raw: memoryview) -> str:
+        """
+        Decode the UTF-8 name, the decoded names are cached. The views of the receive buffers are writable, so they are
+        not hashable and the key is taken with tobytes. The counters are not locked, so they are approximate.
+
+        :type raw: memoryview
+        :param raw: The bytes of the name.
+
+        :rtype: str
+        :return: The interned name.
+        """
+        key = raw.tobytes()
+        name = Strings.CACHE.get(key)
+        if name is not None:
+            Strings.hits += 1
+            try:
+                Strings.CACHE.move_to_end(key)
+            except KeyError:
+                # It was evicted by another thread after the lookup
+                pass
+            return name
+
+        Strings.misses += 1
+        name = intern(str(key, 'UTF-8'))
+        with Strings._lock:
+            Strings.CACHE[key] = name
+            while len(Strings.CACHE) > Strings.SIZE:
+                Strings.CACHE.popitem(last=False)
+        return name
+
+    @staticmethod
+    def stats() -> dict:
+        """
+        Describe the cache for the control API.
+
+        :rtype: dict
+        :return: The names in the cache, the hits, the misses and the hit rate.
+        """
+        hits, misses = Strings.hits, Strings.misses
+        total = hits + misses
+        return {'size': len(Strings.CACHE), 'limit': Strings.SIZE, 'hits': hits, 'misses': misses,
+                'rate': hits / total if total else 0.0}
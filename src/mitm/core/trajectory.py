@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Predict where the actors will be. Every actor has a fixed size ring buffer with its recent positions, the windows of
+the positions add the samples as soon as they are decoded and the position at any time is extrapolated with the linear
+fit of the recent samples. The query of all the visible actors is calculated at once in vectorized form, so the injector
+could use the predicted positions within the same package turnaround.
+"""
+from threading import Lock
+
+from core.memory import Memory
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Trajectory:
+    """
+    Ring buffers with the recent positions of the actors of one port.
+    """
+    ACTIVE = {}
+
+    def __init__(self, size: int = 8, horizon: float = 1.0, capacity: int = 64, max_age: float = 2.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type size: int
+        :param size: Number of samples kept per actor.
+
+        :type horizon: float
+        :param horizon: Seconds before the last sample of the actor which are used for the fit.
+
+        :type capacity: int
+        :param capacity: Initial number of actors, it grows when it is needed.
+
+        :type max_age: float
+        :param max_age: Seconds after the last sample of an actor from which it is not predicted anymore.
+
+        :rtype: Trajectory
+        :return: The object instanced of this class.
+        """
+        self.size = size
+        self.horizon = horizon
+        self.capacity = capacity
+        self.max_age = max_age
+        self.actors = {}
+        self._ids = numpy.zeros(capacity, dtype='<u4')
+        self._samples = numpy.zeros((capacity, size, 4))
+        self._count = numpy.zeros(capacity, dtype=int)
+        self._head = numpy.zeros(capacity, dtype=int)
+        self._lock = Lock()
+
+    @staticmethod
+    def get(port: int) -> 'Trajectory':
+        """
+        Get the ring buffers of the port, they are created the first time. Without NumPy there is no prediction.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: Trajectory
+        :return: The ring buffers of the port, None without NumPy.
+        """
+        if numpy is None:
+            return None
+        trajectory = Trajectory.ACTIVE.get(port)
+        if trajectory is None:
+            trajectory = Trajectory.ACTIVE.setdefault(port, Trajectory())
+        return trajectory
+
+    @staticmethod
+    def close(port: int) -> None:
+        """
+        Remove the ring buffers of a port when its session is closed, the actors of the next session are new.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: None
+        """
+        trajectory = Trajectory.ACTIVE.pop(port, None)
+        if trajectory is not None:
+            Memory.shed('trajectory', trajectory.nbytes)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Bytes allocated by the ring buffers.
+
+        :rtype: int
+        :return: The size of the arrays.
+        """
+        return self._ids.nbytes + self._samples.nbytes + self._count.nbytes + self._head.nbytes
+
+    def add(self, actor: int, timestamp: float, x: float, y: float, z: float) -> None:
+        """
+        Add a sample to the ring buffer of the actor.
+
+        :type actor: int
+        :param actor: The ID of the actor.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        with self._lock:
+            self._add(actor, timestamp, x, y, z)
+
+    def extend(self, actors: object, times: object, x: object, y: object, z: object) -> None:
+        """
+        Add the samples of a decoded window of positions in order.
+
+        :type actors: numpy.ndarray
+        :param actors: The ID of the actor of every sample.
+
+        :type times: numpy.ndarray
+        :param times: The time of every sample.
+
+        :type x: numpy.ndarray
+        :param x: Positions in the axis X.
+
+        :type y: numpy.ndarray
+        :param y: Positions in the axis Y.
+
+        :type z: numpy.ndarray
+        :param z: Positions in the axis Z.
+
+        :rtype: None
+        """
+        with self._lock:
+            for sample in zip(actors.tolist(), times.tolist(), x.tolist(), y.tolist(), z.tolist()):
+                self._add(*sample)
+
+    def _add(self, actor: int, timestamp: float, x: float, y: float, z: float) -> None:
+        """
+        Add a sample to the ring buffer of the actor. The lock must be taken.
+
+        :type actor: int
+        :param actor: The ID of the actor.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        row = self.actors.get(actor)
+        if row is None:
+            row = self._allocate(actor)
+        head = self._head[row]
+        self._samples[row, head] = (timestamp, x, y, z)
+        self._head[row] = (head + 1) % self.size
+        if self._count[row] < self.size:
+            self._count[row] += 1
+
+    def prune(self, before: float) -> int:
+        """
+        Remove the actors without samples after a time, the ring buffers of the others are compacted.
+
+        :type before: float
+        :param before: The time of the oldest last sample which is kept.
+
+        :rtype: int
+        :return: The number of bytes of the removed actors.
+        """
+        with self._lock:
+            rows = numpy.arange(len(self.actors))
+            last_time = self._samples[rows, (self._head[rows] - 1) % self.size, 0]
+            keep = rows[(self._count[rows] > 0) & (last_time >= before)]
+            if len(keep) == len(rows):
+                return 0
+
+            released = (len(rows) - len(keep)) * (self.nbytes // len(self._ids))
+            capacity = max(self.capacity, len(keep))
+            for name in ('_ids', '_samples', '_count', '_head'):
+                old = getattr(self, name)
+                new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:len(keep)] = old[keep]
+                setattr(self, name, new)
+            self.actors = {int(actor): row for row, actor in enumerate(self._ids[:len(keep)])}
+        Memory.shed('trajectory', released)
+        return released
+
+    def predict(self, actor: int, timestamp: float) -> tuple:
+        """
+        Extrapolate the position of one actor.
+
+        :type actor: int
+        :param actor: The ID of the actor.
+
+        :type timestamp: float
+        :param timestamp: The time of the prediction.
+
+        :rtype: tuple
+        :return: The position x, y, z, None if the actor has no samples or the last one is older than the maximum age.
+        """
+        with self._lock:
+            row = self.actors.get(actor)
+            if row is None or self._count[row] == 0:
+                return None
+            if timestamp - self._samples[row, (self._head[row] - 1) % self.size, 0] > self.max_age:
+                return None
+            position = self._fit(numpy.array([row]), timestamp)[0]
+        return float(position[0]), float(position[1]), float(position[2])
+
+    def predict_all(self, timestamp: float) -> tuple:
+        """
+        Extrapolate the position of all the actors which have samples. The actors without samples within the maximum
+        age are skipped.
+
+        :type timestamp: float
+        :param timestamp: The time of the prediction.
+
+        :rtype: tuple
+        :return: The array of the actor IDs and the array of their positions (x, y, z).
+        """
+        with self._lock:
+            rows = numpy.flatnonzero(self._count[:len(self.actors)])
+            last_time = self._samples[rows, (self._head[rows] - 1) % self.size, 0]
+            rows = rows[timestamp - last_time <= self.max_age]
+            return self._ids[rows].copy(), self._fit(rows, timestamp)
+
+    def _allocate(self, actor: int) -> int:
+        """
+        Assign a ring buffer to a new actor, the buffers are doubled when they are full. The lock must be taken.
+
+        :type actor: int
+        :param actor: The ID of the actor.
+
+        :rtype: int
+        :return: The row of the actor.
+        """
+        row = len(self.actors)
+        if row == len(self._ids):
+            self._ids = numpy.concatenate((self._ids, numpy.zeros_like(self._ids)))
+            self._samples = numpy.concatenate((self._samples, numpy.zeros_like(self._samples)))
+            self._count = numpy.concatenate((self._count, numpy.zeros_like(self._count)))
+            self._head = numpy.concatenate((self._head, numpy.zeros_like(self._head)))
+        self._ids[row] = actor
+        self.actors[actor] = row
+        return row
+
+    def _fit(self, rows: object, timestamp: float) -> object:
+        """
+        Fit a line per axis with the recent samples of every row and evaluate it at the time. When the samples have the
+        same time the last position is returned. The lock must be taken.
+
+        :type rows: numpy.ndarray
+        :param rows: The rows of the actors.
+
+        :type timestamp: float
+        :param timestamp: The time of the prediction.
+
+        :rtype: numpy.ndarray
+        :return: The position (x, y, z) of every row.
+        """
+        samples = self._samples[rows]
+        times = samples[:, :, 0]
+        positions = samples[:, :, 1:]
+        last = (self._head[rows] - 1) % self.size
+        last_time = times[numpy.arange(len(rows)), last]
+        last_position = positions[numpy.arange(len(rows)), last]
+
+        slots = numpy.arange(self.size)[None, :] < self._count[rows][:, None]
+        weights = (slots & (times >= last_time[:, None] - self.horizon)).astype(float)
+        total = weights.sum(axis=1)
+
+        relative = times - last_time[:, None]
+        mean_time = (weights * relative).sum(axis=1) / total
+        mean_position = (weights[:, :, None] * positions).sum(axis=1) / total[:, None]
+        centered_time = (relative - mean_time[:, None]) * weights
+        variance = (centered_time * centered_time).sum(axis=1)
+        covariance = (centered_time[:, :, None] * (positions - mean_position[:, None, :])).sum(axis=1)
+
+        moving = variance > 0
+        slope = numpy.zeros_like(mean_position)
+        slope[moving] = covariance[moving] / variance[moving, None]
+        elapsed = timestamp - last_time - mean_time
+        predicted = mean_position + slope * elapsed[:, None]
+        predicted[~moving] = last_position[~moving]
+        return predicted
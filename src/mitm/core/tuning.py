@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Create a singleton class to keep the socket options of the proxied connections. The small packages of the position and
+the shoots are latency critical, so by default Nagle's algorithm is disabled and the delayed ACK is avoided. Every port
+could have its own profile and it is changed at runtime from the console. The options are only hints, so a socket which
+does not support them (e.g. not TCP) is relayed without them.
+"""
+from socket import socket, IPPROTO_TCP, SOL_SOCKET, SO_RCVBUF, SO_SNDBUF, TCP_CORK, TCP_NODELAY, TCP_QUICKACK
+
+
+class Tuning:
+    """
+    Keep the profile of the socket options for every port.
+    """
+    DEFAULT = {
+        'nodelay': True,
+        'quickack': True,
+        'rcvbuf': 262144,
+        'sndbuf': 262144,
+        'cork': False,
+    }
+    PORTS = {}
+
+    @staticmethod
+    def profile(port: int) -> dict:
+        """
+        Get the options of the port. The options which are not changed for the port are taken from the default.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: dict
+        :return: The socket options.
+        """
+        return {**Tuning.DEFAULT, **Tuning.PORTS.get(port, {})}
+
+    @staticmethod
+    def set(port: int, option: str, value: str) -> None:
+        """
+        Change one option of the port. The new connections use it, the current ones when they are paired again.
+
+        :type port: int
+        :param port: The number of the port for the communication, zero changes the default profile.
+
+        :type option: str
+        :param option: Name of the option: nodelay, quickack, rcvbuf, sndbuf or cork.
+
+        :type value: str
+        :param value: The value of the option, on/off for the flags and bytes for the buffers.
+
+        :rtype: None
+        """
+        if option not in Tuning.DEFAULT:
+            raise ValueError(f'Unknown socket option {option}')
+
+        if isinstance(Tuning.DEFAULT[option], bool):
+            parsed = value.lower() in ('1', 'on', 'true', 'yes')
+        else:
+            parsed = int(value)
+
+        if port == 0:
+            Tuning.DEFAULT[option] = parsed
+        else:
+            Tuning.PORTS.setdefault(port, {})[option] = parsed
+
+    @staticmethod
+    def apply(connection: socket, port: int) -> None:
+        """
+        Set the options of the port profile in the connection.
+
+        :type connection: socket
+        :param connection: One leg of the proxied connection.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: None
+        """
+        profile = Tuning.profile(port)
+        Tuning._set(connection, IPPROTO_TCP, TCP_NODELAY, int(profile['nodelay']))
+        Tuning._set(connection, IPPROTO_TCP, TCP_QUICKACK, int(profile['quickack']))
+        if profile['rcvbuf']:
+            Tuning._set(connection, SOL_SOCKET, SO_RCVBUF, profile['rcvbuf'])
+        if profile['sndbuf']:
+            Tuning._set(connection, SOL_SOCKET, SO_SNDBUF, profile['sndbuf'])
+
+    @staticmethod
+    def quickack(connection: socket) -> None:
+        """
+        The kernel resets the quick ACK after some packages, so it is set again after every receive.
+
+        :type connection: socket
+        :param connection: The source connection.
+
+        :rtype: None
+        """
+        Tuning._set(connection, IPPROTO_TCP, TCP_QUICKACK, 1)
+
+    @staticmethod
+    def cork(connection: socket, enabled: bool) -> None:
+        """
+        Hold the partial frames while several writes are coalesced, they are sent together when it is disabled.
+
+        :type connection: socket
+        :param connection: The destination connection.
+
+        :type enabled: bool
+        :param enabled: True to start the batch, False to flush it.
+
+        :rtype: None
+        """
+        Tuning._set(connection, IPPROTO_TCP, TCP_CORK, int(enabled))
+
+    @staticmethod
+    def _set(connection: socket, level: int, option: int, value: int) -> None:
+        """
+        Set a socket option, the errors of the sockets which do not support it are ignored. They are not logged, the
+        quick ACK is set again after every receive.
+
+        :type connection: socket
+        :param connection: One leg of the proxied connection.
+
+        :type level: int
+        :param level: The protocol level of the option.
+
+        :type option: int
+        :param option: The socket option.
+
+        :type value: int
+        :param value: The value of the option.
+
+        :rtype: None
+        """
+        try:
+            connection.setsockopt(level, option, value)
+        except OSError:
+            pass
+
+    @staticmethod
+    def table() -> list:
+        """
+        Get the default profile, as port zero, and the profile of every changed port.
+
+        :rtype: list
+        :return: The port and its socket options.
+        """
+        table = [{'port': 0, **Tuning.DEFAULT}]
+        for port in sorted(Tuning.PORTS):
+            table.append({'port': port, **Tuning.profile(port)})
+        return table
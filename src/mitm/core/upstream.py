@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Keep warm standby connections to the game servers. When the client changes the zone it reconnects to a different game
+port, so instead of connecting to the server after the client is accepted, the proxy takes a socket which is already
+established and the new client is paired immediately.
+"""
+from socket import socket, create_connection, IPPROTO_TCP, MSG_DONTWAIT, MSG_PEEK, SOL_SOCKET, SO_KEEPALIVE, \
+    TCP_KEEPCNT, TCP_KEEPIDLE, TCP_KEEPINTVL
+from threading import Thread, Event, Lock
+from time import monotonic
+
+from core.tuning import Tuning
+
+
+class Upstream(Thread):
+    """
+    Pool of connections to the server per host and port. A background thread checks the health of the idle
+    connections and refills the standby sockets.
+    """
+
+    def __init__(self, standby: int = 1, interval: float = 2.0, max_idle: float = 60.0, timeout: float = 5.0) -> None:
+        """
+        Constructor which init the class.
+
+        :type standby: int
+        :param standby: Number of established connections waiting for a client per host and port.
+
+        :type interval: float
+        :param interval: Seconds between every health check.
+
+        :type max_idle: float
+        :param max_idle: Seconds that a standby connection lives before it is replaced by a new one.
+
+        :type timeout: float
+        :param timeout: Seconds to wait for the server when a new connection is opened.
+
+        :rtype: Upstream
+        :return: The object instanced of this class.
+        """
+        super(Upstream, self).__init__()
+        self.name = 'Upstream'
+        self.daemon = True
+        self.standby = standby
+        self.interval = interval
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self.targets = set()
+        self.pool = {}
+        self._lock = Lock()
+        self._refill = Event()
+        self._running = True
+
+    def watch(self, host: str, port: int) -> None:
+        """
+        Keep standby connections to this game server.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: None
+        """
+        with self._lock:
+            self.targets.add((host, port))
+        self._refill.set()
+
+    def acquire(self, host: str, port: int) -> socket:
+        """
+        Take an established connection to the server. If there is no healthy standby connection a new one is opened.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: socket
+        :return: The connection to the server.
+        """
+        while True:
+            with self._lock:
+                standby = self.pool.get((host, port), [])
+                if not standby:
+                    break
+                server, created = standby.pop(0)
+            self._refill.set()
+            if self._is_alive(server):
+                return server
+            server.close()
+
+        self._refill.set()
+        return self._connect(host, port)
+
+    def terminate(self) -> None:
+        """
+        Stop the health check and close the standby connections.
+
+        :rtype: None
+        """
+        self._running = False
+        self._refill.set()
+        with self._lock:
+            for standby in self.pool.values():
+                for server, created in standby:
+                    server.close()
+            self.pool.clear()
+
+    def run(self) -> None:
+        """
+        Check the standby connections and open the missing ones.
+        Run in a new thread.
+
+        :rtype: None
+        """
+        while self._running:
+            self._refill.wait(self.interval)
+            self._refill.clear()
+            with self._lock:
+                targets = list(self.targets)
+
+            for host, port in targets:
+                if not self._running:
+                    break
+                self._check(host, port)
+
+    def _check(self, host: str, port: int) -> None:
+        """
+        Drop the dead or expired connections and fill the pool until it has the standby connections.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: None
+        """
+        now = monotonic()
+        with self._lock:
+            standby = self.pool.setdefault((host, port), [])
+            healthy = []
+            for server, created in standby:
+                if now - created < self.max_idle and self._is_alive(server):
+                    healthy.append((server, created))
+                else:
+                    server.close()
+            standby[:] = healthy
+            missing = self.standby - len(standby)
+
+        for _ in range(missing):
+            try:
+                server = self._connect(host, port)
+            except OSError as e:
+                print(f'Upstream [{port}]: Server not available ---> {e}')
+                return
+            with self._lock:
+                self.pool.setdefault((host, port), []).append((server, monotonic()))
+
+    def _connect(self, host: str, port: int) -> socket:
+        """
+        Open a new connection to the server with the low latency options.
+
+        :type host: str
+        :param host: The server's IP.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :rtype: socket
+        :return: The connection to the server.
+        """
+        server = create_connection((host, port), self.timeout)
+        server.settimeout(None)
+        Tuning.apply(server, port)
+        server.setsockopt(SOL_SOCKET, SO_KEEPALIVE, 1)
+        server.setsockopt(IPPROTO_TCP, TCP_KEEPIDLE, 10)
+        server.setsockopt(IPPROTO_TCP, TCP_KEEPINTVL, 5)
+        server.setsockopt(IPPROTO_TCP, TCP_KEEPCNT, 3)
+        return server
+
+    @staticmethod
+    def _is_alive(server: socket) -> bool:
+        """
+        Check without blocking if the server did not close the connection.
+
+        :type server: socket
+        :param server: The connection to the server.
+
+        :rtype: bool
+        :return: True if the connection is still open.
+        """
+        try:
+            return len(server.recv(1, MSG_PEEK | MSG_DONTWAIT)) > 0
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+State of the world built from the events of the parser: the entities with their name, type, position and health and the
+inventory of your player. It is saved in the snapshots of the captures and restored when a session is replayed.
+"""
+
+
+class World:
+    """
+    Entities and inventory of every port.
+    """
+
+    def __init__(self) -> None:
+        """
+        Constructor which init the class.
+
+        :rtype: World
+        :return: The object instanced of this class.
+        """
+        self.time = 0.0
+        self.entities = {}
+        self.inventory = {}
+
+    def apply(self, port: int, timestamp: float, events: list) -> None:
+        """
+        Update the state with the events of one package.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type events: list
+        :param events: The name and the values of every event.
+
+        :rtype: None
+        """
+        self.time = timestamp
+        for name, fields in events:
+            if name == 'init':
+                entity = self._entity(port, fields['actor'], timestamp)
+                entity.update(name=fields['name'], type=fields['type'], x=fields['x'], y=fields['y'], z=fields['z'])
+            elif name == 'character_position':
+                entity = self._entity(port, fields['actor'], timestamp)
+                entity.update(x=fields['x'], y=fields['y'], z=fields['z'])
+            elif name in ('client_position', 'my_position'):
+                entity = self._entity(port, 0, timestamp)
+                entity.update(x=fields['x'], y=fields['y'], z=fields['z'])
+            elif name == 'health':
+                entity = self._entity(port, fields['actor'], timestamp)
+                entity['health'] = fields['health']
+            elif name in ('item', 'item_recollection'):
+                self.inventory.setdefault(str(port), {})[fields['name']] = fields['amount']
+
+    def move(self, port: int, actor: int, timestamp: float, x: float, y: float, z: float) -> None:
+        """
+        Update the position of one actor, the live positions are decoded in windows and they are not events.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type actor: int
+        :param actor: The ID of the actor, zero for your player.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :type x: float
+        :param x: Position in the axis X.
+
+        :type y: float
+        :param y: Position in the axis Y.
+
+        :type z: float
+        :param z: Position in the axis Z.
+
+        :rtype: None
+        """
+        self._entity(port, actor, timestamp).update(x=x, y=y, z=z)
+
+    def _entity(self, port: int, actor: int, timestamp: float) -> dict:
+        """
+        Get the entity of the actor, it is created the first time.
+
+        :type port: int
+        :param port: The number of the port for the communication.
+
+        :type actor: int
+        :param actor: The ID of the actor, zero for your player.
+
+        :type timestamp: float
+        :param timestamp: The time when the package was received.
+
+        :rtype: dict
+        :return: The values of the entity.
+        """
+        key = f'{port}:{actor}'
+        entity = self.entities.get(key)
+        if entity is None:
+            entity = self.entities[key] = {'port': port, 'actor': actor}
+        entity['updated'] = timestamp
+        return entity
+
+    def snapshot(self) -> dict:
+        """
+        Copy the state in a JSON serializable form.
+
+        :rtype: dict
+        :return: The time, entities and inventory.
+        """
+        return {
+            'time': self.time,
+            'entities': {key: dict(entity) for key, entity in self.entities.items()},
+            'inventory': {port: dict(items) for port, items in self.inventory.items()},
+        }
+
+    @staticmethod
+    def restore(snapshot: dict) -> 'World':
+        """
+        Create the world from a snapshot.
+
+        :type snapshot: dict
+        :param snapshot: The state returned by snapshot.
+
+        :rtype: World
+        :return: The restored world.
+        """
+        world = World()
+        world.time = snapshot['time']
+        world.entities = {key: dict(entity) for key, entity in snapshot['entities'].items()}
+        world.inventory = {port: dict(items) for port, items in snapshot['inventory'].items()}
+        return world
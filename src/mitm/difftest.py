@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Differential test of the parser. The old and the new parser decode the same segments of the recorded sessions in a pool
+of processes and their structured events are compared record by record, so a change of a handler which shifts the
+offsets of the following messages is found immediately. The first divergence of every segment is reported with the
+throughput of both versions. The parsers are replayed without side effects and with the recorded times, so the result
+is deterministic.
+
+Both parsers need the live flag and the structured events, which the parser has since the sessions are recorded, so
+the revisions before the capture could not be compared.
+
+Usage: python3 difftest.py captures/*.cap --rev HEAD~1
+       python3 difftest.py captures/*.cap --old /tmp/parser.py --new core/parser.py
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+from functools import partial
+from hashlib import sha1
+from importlib.util import module_from_spec, spec_from_file_location
+from inspect import signature
+from os import cpu_count, devnull, path, unlink
+from subprocess import check_output
+from sys import exit as sys_exit, modules
+from tempfile import NamedTemporaryFile
+from time import perf_counter
+
+from core.capture import Recording
+
+PARSERS = {}
+
+
+def load(filename: str) -> object:
+    """
+    Load the Parse class of a parser file. Every file is loaded once per process with its own module name. The parsers
+    are created without side effects.
+
+    :type filename: str
+    :param filename: Path of the parser.
+
+    :rtype: callable
+    :return: The constructor of the parser.
+    """
+    parse = PARSERS.get(filename)
+    if parse is None:
+        name = f'parser_{sha1(filename.encode("UTF-8")).hexdigest()[:12]}'
+        spec = spec_from_file_location(name, filename)
+        module = module_from_spec(spec)
+        modules[name] = module
+        spec.loader.exec_module(module)
+        parse = PARSERS[filename] = partial(module.Parse, live=False)
+    return parse
+
+
+def check(filename: str) -> str:
+    """
+    Check that a parser could be compared: it must be replayed without side effects and return the structured events.
+
+    :type filename: str
+    :param filename: Path of the parser.
+
+    :rtype: str
+    :return: The reason, empty when the parser could be compared.
+    """
+    try:
+        parse = load(filename).func
+    except Exception as e:
+        return f'it could not be loaded with the current modules ({type(e).__name__}: {e})'
+    missing = []
+    if 'live' not in signature(parse).parameters:
+        missing.append('live flag')
+    if not hasattr(parse, '_event'):
+        missing.append('structured events')
+    return f'it has no {" and no ".join(missing)}' if missing else ''
+
+
+def decode(parse: object, timestamp: float, port: int, is_server: bool, data: bytes) -> tuple:
+    """
+    Decode one record without side effects.
+
+    :type parse: callable
+    :param parse: The constructor of the parser.
+
+    :type timestamp: float
+    :param timestamp: The time of the record.
+
+    :type port: int
+    :param port: The number of the port for the communication.
+
+    :type is_server: bool
+    :param is_server: True if the data comes from the server.
+
+    :type data: bytes
+    :param data: Raw data of the record.
+
+    :rtype: tuple
+    :return: The events and the error, None when the record was decoded.
+    """
+    parser = parse(data)
+    parser.time = timestamp
+    error = None
+    try:
+        if is_server:
+            parser.server(port)
+        else:
+            parser.client(port)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+    return getattr(parser, 'events', []), error
+
+
+def same(old: object, new: object) -> bool:
+    """
+    Compare the results of both parsers. The NaN values of the positions are equal.
+
+    :type old: object
+    :param old: The result of the old parser.
+
+    :type new: object
+    :param new: The result of the new parser.
+
+    :rtype: bool
+    :return: True if they are equal.
+    """
+    return old == new or repr(old) == repr(new)
+
+
+def compare(filename: str, first: int, end: int, old_parser: str, new_parser: str) -> dict:
+    """
+    Decode one segment with both parsers and find the first divergence. It runs in a worker process.
+
+    :type filename: str
+    :param filename: Path of the capture.
+
+    :type first: int
+    :param first: Offset of the first record of the segment.
+
+    :type end: int
+    :param end: Offset where the segment ends.
+
+    :type old_parser: str
+    :param old_parser: Path of the old parser.
+
+    :type new_parser: str
+    :param new_parser: Path of the new parser.
+
+    :rtype: dict
+    :return: The records, the divergences, the first divergence and the time of both parsers.
+    """
+    # The parsers print their messages, they are discarded in the workers
+    with open(devnull, 'w') as sink, redirect_stdout(sink):
+        old, new = load(old_parser), load(new_parser)
+        records = size = divergences = 0
+        old_time = new_time = 0.0
+        divergence = None
+        recording = Recording(filename)
+        for timestamp, port, is_server, data in recording.records(offset=first, stop=end):
+            records += 1
+            size += len(data)
+            # The first record warms up both parsers and then the order is alternated, so the caches warmed by the first
+            # parser do not favour one version
+            if records == 1:
+                decode(old, timestamp, port, is_server, data)
+                decode(new, timestamp, port, is_server, data)
+            if records % 2:
+                started = perf_counter()
+                old_events, old_error = decode(old, timestamp, port, is_server, data)
+                middle = perf_counter()
+                new_events, new_error = decode(new, timestamp, port, is_server, data)
+                new_time += perf_counter() - middle
+                old_time += middle - started
+            else:
+                started = perf_counter()
+                new_events, new_error = decode(new, timestamp, port, is_server, data)
+                middle = perf_counter()
+                old_events, old_error = decode(old, timestamp, port, is_server, data)
+                old_time += perf_counter() - middle
+                new_time += middle - started
+
+            if same(old_events, new_events) and old_error == new_error:
+                continue
+            divergences += 1
+            if divergence is None:
+                index = next((idx for idx, (old_event, new_event) in enumerate(zip(old_events, new_events))
+                              if not same(old_event, new_event)), min(len(old_events), len(new_events)))
+                divergence = {
+                    'record': records - 1, 'time': timestamp, 'port': port,
+                    'direction': 'server' if is_server else 'client', 'event': index,
+                    'old': repr(old_events[index]) if index < len(old_events) else None,
+                    'new': repr(new_events[index]) if index < len(new_events) else None,
+                    'old_error': old_error, 'new_error': new_error, 'data': data[:64].hex(),
+                }
+        recording.close()
+        return {'file': filename, 'first': first, 'records': records, 'bytes': size, 'divergences': divergences,
+                'divergence': divergence, 'old_time': old_time, 'new_time': new_time}
+
+
+def revision(rev: str) -> str:
+    """
+    Write the parser of a git revision in a temporary file.
+
+    :type rev: str
+    :param rev: The git revision, e.g. HEAD~1.
+
+    :rtype: str
+    :return: The path of the parser.
+    """
+    here = path.dirname(path.abspath(__file__))
+    root = check_output(['git', 'rev-parse', '--show-toplevel'], cwd=here, text=True).strip()
+    relative = path.relpath(path.join(here, 'core', 'parser.py'), root)
+    source = check_output(['git', 'show', f'{rev}:{relative}'], cwd=root)
+    with NamedTemporaryFile('wb', prefix='parser-', suffix='.py', delete=False) as file:
+        file.write(source)
+    return file.name
+
+
+def run(segments: list, old_parser: str, new_parser: str, workers: int) -> tuple:
+    """
+    Compare the segments in the pool of processes and print the first divergence of every segment when it is finished.
+
+    :type segments: list
+    :param segments: The capture, the first and the end offset of every segment.
+
+    :type old_parser: str
+    :param old_parser: Path of the old parser.
+
+    :type new_parser: str
+    :param new_parser: Path of the new parser.
+
+    :type workers: int
+    :param workers: Number of processes.
+
+    :rtype: tuple
+    :return: The diverged segments, the records, the bytes and the time of the old and the new parser.
+    """
+    records = size = diverged = 0
+    old_time = new_time = 0.0
+    with ProcessPoolExecutor(workers) as executor:
+        futures = [executor.submit(compare, filename, first, end, old_parser, new_parser)
+                   for filename, first, end in segments]
+        for future in as_completed(futures):
+            result = future.result()
+            records += result['records']
+            size += result['bytes']
+            old_time += result['old_time']
+            new_time += result['new_time']
+            divergence = result['divergence']
+            if divergence is None:
+                continue
+            diverged += 1
+            print(f'DIVERGED: {result["file"]} @ {result["first"]} | {result["divergences"]} records | First: record '
+                  f'{divergence["record"]} time {divergence["time"]:.6f} '
+                  f'{divergence["direction"]}[{divergence["port"]}] event #{divergence["event"]}\n'
+                  f'  old: {divergence["old"]} {divergence["old_error"] or ""}\n'
+                  f'  new: {divergence["new"]} {divergence["new_error"] or ""}\n'
+                  f'  data: {divergence["data"]}')
+    return diverged, records, size, old_time, new_time
+
+
+def main() -> None:
+    """
+    Main function which split the captures in segments and compare the parsers in parallel.
+
+    :rtype: None
+    """
+    here = path.dirname(path.abspath(__file__))
+    arguments = ArgumentParser(description='Compare the events of two versions of the parser over recorded sessions.')
+    arguments.add_argument('captures', nargs='+', help='Paths of the captures.')
+    old = arguments.add_mutually_exclusive_group(required=True)
+    old.add_argument('--old', help='Path of the old parser.')
+    old.add_argument('--rev', help='Git revision of the old parser, e.g. HEAD~1.')
+    arguments.add_argument('--new', default=path.join(here, 'core', 'parser.py'), help='Path of the new parser.')
+    arguments.add_argument('--workers', type=int, default=cpu_count(), help='Number of processes.')
+    arguments.add_argument('--segment', type=float, default=60.0, help='Seconds of traffic of every segment.')
+    options = arguments.parse_args()
+
+    old_parser = path.abspath(options.old) if options.old else revision(options.rev)
+    new_parser = path.abspath(options.new)
+    for label, parser in (('old', old_parser), ('new', new_parser)):
+        reason = check(parser)
+        if reason:
+            if options.rev:
+                unlink(old_parser)
+            print(f'Difftest: The {label} parser {options.rev if label == "old" and options.rev else parser} could not '
+                  f'be compared, {reason}. Use a revision which records the sessions (--capture) or a later one.')
+            sys_exit(2)
+    segments = []
+    for filename in options.captures:
+        recording = Recording(filename)
+        segments.extend((filename, first, end) for first, end in recording.shards(options.segment))
+        recording.close()
+    print(f'Difftest: {old_parser} -> {new_parser} | {len(segments)} segments with {options.workers} workers')
+
+    try:
+        diverged, records, size, old_time, new_time = run(segments, old_parser, new_parser, options.workers)
+    finally:
+        if options.rev:
+            unlink(old_parser)
+
+    old_rate = size / old_time / 1e6 if old_time else 0.0
+    new_rate = size / new_time / 1e6 if new_time else 0.0
+    delta = (new_rate / old_rate - 1) * 100 if old_rate else 0.0
+    print(f'Segments {len(segments)} | Diverged {diverged} | Records {records} | Bytes {size}')
+    print(f'Throughput: old {old_rate:.2f} MB/s | new {new_rate:.2f} MB/s | delta {delta:+.1f}%')
+    sys_exit(1 if diverged else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,64 +4,100 @@
 Entrypoint of the application. Main in the Middle Attack is basically a proxy which get and send the package between the
 client and server but we have the opportunity to analyze or modify this information.
 """
-from os import kill
-from signal import SIGTERM
-from threading import enumerate as threading_enumerate
+from argparse import ArgumentParser
+from os import makedirs, path
+from threading import Thread
+from time import strftime
 
-from core.proxy import Proxy
-from core.queue import Queue
+from core.capture import Capture
+from core.console import Console
+from core.control import Control
+from core.export import Export
+from core.log import Log
+from core.memory import Memory
+from core.profiler import Profiler
+from core.router import Router
+from core.startup import Startup
+from core.upstream import Upstream
 
 
 def main() -> None:
     """
-    Main function which start the 'man in the middle attack'.
+    Main function which start the 'man in the middle attack'. The listeners are bound first, so the clients which
+    reconnect after a restart are queued while the rest of the proxy starts. They are accepted when the export and the
+    capture are ready, so no connection is missed, and the parser is only loaded with the first package.
 
     :rtype: None
     """
+    arguments = ArgumentParser(description='Man in the middle proxy for PwnAdventure3.')
+    arguments.add_argument('--headless', action='store_true', help='Do not open the console, use the control API.')
+    arguments.add_argument('--control', default='./control.sock', help='Path of the Unix socket of the control API.')
+    arguments.add_argument('--export', metavar='DIR', help='Export the parsed events in columnar files to DIR.')
+    arguments.add_argument('--capture', metavar='DIR', help='Record the traffic in DIR to replay it with replay.py.')
+    arguments.add_argument('--profile-startup', action='store_true', help='Print the time of every stage of the boot.')
+    options = arguments.parse_args()
+    startup = Startup(options.profile_startup)
+    Log.setup()
+    startup.mark('Log')
+
     from_host = '0.0.0.0'
     to_host = '192.168.100.230'
     port_server = 3333
     ports_client = range(3000, 3006)
 
-    server = Proxy(from_host, to_host, port_server)
-    server.start()
-
-    clients = []
+    upstream = Upstream()
+    router = Router(from_host, port_server, upstream)
+    router.add(to_host, port_server, start=False)
     for port in ports_client:
-        client_server = Proxy(from_host, to_host, port)
-        client_server.start()
-        clients.append(client_server)
-
-    while True:
-        try:
-            cmd = input('>>> ').lower()
-            if cmd == 'hello':
-                print('Hello World!')
-            elif cmd in ('quit', 'q', 'exit'):
-                for thread in threading_enumerate():
-                    kill(thread.native_id, SIGTERM)
-            elif cmd in ('t', 'thread', 'threads'):
-                for thread in threading_enumerate():
-                    message = f'| {thread.name:>25} | PID {thread.native_id} | ID {thread.ident} | ' \
-                              f'Alive {thread.is_alive()} | Daemon {thread.daemon} |'
-                    print(message)
-            elif cmd[0:4] == 'hck ':
-                options = cmd[4:].split(' ')
-                target = options[0]
-                retries = 5
-                if len(options) > 1:
-                    retries = int(options[1])
-                Queue.HACKS.append((target, retries))
-            elif cmd[0:2] == 's ':
-                for client_server in clients:
-                    if client_server.running:
-                        Queue.SERVER_QUEUE.append(bytearray.fromhex(cmd[2:]))
-            elif cmd[0:2] == 'c ':
-                for client_server in clients:
-                    if client_server.running:
-                        Queue.CLIENT_QUEUE.append(bytearray.fromhex(cmd[2:]))
-        except Exception as e:
-            print(f'ERROR: Input section ---> {e}')
+        router.add(to_host, port, start=False)
+    startup.mark('Listeners')
+
+    upstream.start()
+    Memory.ACTIVE = Memory(router)
+    Memory.ACTIVE.start()
+    startup.mark('Upstream and memory')
+
+    control = Control(options.control, router)
+    control.start()
+    ready = control.ready.wait(5)
+    startup.mark('Control API')
+
+    if options.export:
+        export = Export(options.export)
+        if export.format:
+            export.start()
+            Export.ACTIVE = export
+        else:
+            print('Export: Install pyarrow or numpy to export the events')
+
+    if options.capture:
+        makedirs(options.capture, exist_ok=True)
+        Capture.ACTIVE = Capture(path.join(options.capture, f'{strftime("%Y%m%d-%H%M%S")}.cap'))
+    startup.mark('Export and capture')
+
+    router.start()
+    startup.mark('Accept')
+    startup.report()
+
+    if not options.headless and ready:
+        Thread(target=Console(options.control).run, name='Console', daemon=True).start()
+
+    try:
+        control.stopped.wait()
+    except KeyboardInterrupt:
+        pass
+
+    print('Proxy: Shutting down')
+    control.terminate()
+    Memory.ACTIVE.terminate()
+    if Profiler.ACTIVE is not None and Profiler.ACTIVE.is_alive():
+        Profiler.ACTIVE.terminate()
+    router.terminate()
+    upstream.terminate()
+    if Export.ACTIVE is not None:
+        Export.ACTIVE.terminate()
+    if Capture.ACTIVE is not None:
+        Capture.ACTIVE.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: UTF-8 -*-
+"""
+Seek to any moment of a recorded session and print the world: the entities with their position and health and the
+inventory of your player. The captures are recorded with the option --capture of main.py.
+
+Usage: python3 replay.py captures/20240101-140000.cap --at 14:03:22
+"""
+from argparse import ArgumentParser
+from datetime import datetime
+
+from core.capture import Recording
+
+
+def moment(value: str, first: float) -> float:
+    """
+    Translate the time of the command line to a timestamp. It could be the time of the day of the first record
+    (HH:MM:SS), an ISO date or the seconds of the epoch.
+
+    :type value: str
+    :param value: The time written by the user.
+
+    :type first: float
+    :param first: The time of the first record of the capture.
+
+    :rtype: float
+    :return: The timestamp.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        clock = datetime.strptime(value, '%H:%M:%S').time()
+        return datetime.combine(datetime.fromtimestamp(first).date(), clock).timestamp()
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def main() -> None:
+    """
+    Main function which restore the world at the requested time.
+
+    :rtype: None
+    """
+    arguments = ArgumentParser(description='Seek to any moment of a recorded session of the proxy.')
+    arguments.add_argument('capture', help='Path of the capture.')
+    arguments.add_argument('--at', help='HH:MM:SS, ISO date or epoch seconds, the end of the capture by default.')
+    options = arguments.parse_args()
+
+    recording = Recording(options.capture)
+    first = next(recording.records(), None)
+    if first is None:
+        print(f'{options.capture} is empty')
+        return
+    timestamp = moment(options.at, first[0]) if options.at else float('inf')
+
+    world = recording.world_at(timestamp)
+    print(f'World at {datetime.fromtimestamp(world.time).isoformat()}')
+    for entity in sorted(world.entities.values(), key=lambda item: (item['port'], item['actor'])):
+        print(f'| Port {entity["port"]:>5} | Actor {entity["actor"]:>6} | {entity.get("name", ""):>20} | '
+              f'{entity.get("x", 0.0):10.2f} X | {entity.get("y", 0.0):10.2f} Y | {entity.get("z", 0.0):10.2f} Z | '
+              f'Health {entity.get("health", "")} |')
+    for port, items in world.inventory.items():
+        for name, amount in items.items():
+            print(f'| Port {port:>5} | {name:>30} | Amount {amount} |')
+    recording.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+# -*- coding: UTF-8 -*-
+"""
+The tests import the proxy from the folder of main.py.
+"""
+from os import path
+from sys import path as sys_path
+
+sys_path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
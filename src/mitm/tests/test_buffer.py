@@ -0,0 +1,89 @@
+# -*- coding: UTF-8 -*-
+"""
+Adaptive read size of the receive buffer. The reads are simulated with a fake socket which fills the requested size or
+returns the next chunk.
+"""
+from core.buffer import Buffer
+
+
+class Source:
+    """
+    Socket which returns reads of the given sizes, None fills the whole read size.
+    """
+
+    def __init__(self, *sizes) -> None:
+        self.sizes = list(sizes)
+
+    def recv_into(self, view: memoryview, size: int) -> int:
+        wanted = self.sizes.pop(0)
+        if wanted is None:
+            wanted = size
+        view[:wanted] = b'\x01' * wanted
+        return wanted
+
+
+class Reset:
+    """
+    Socket whose connection was reset by the peer.
+    """
+
+    def recv_into(self, view: memoryview, size: int) -> int:
+        raise ConnectionResetError(104, 'Connection reset by peer')
+
+
+def test_grows_until_the_limit() -> None:
+    buffer = Buffer(size=4096, maximum=20000)
+    source = Source(*[None] * 5)
+    reads, sizes = [], []
+    for _ in range(5):
+        reads.append(len(buffer.receive(source)))
+        sizes.append(buffer.size)
+    assert reads == [4096, 8192, 16384, 20000, 20000]
+    assert sizes == [8192, 16384, 20000, 20000, 20000]
+    assert buffer.capacity == 20000
+
+
+def test_shrinks_after_small_reads() -> None:
+    buffer = Buffer(size=4096, maximum=65536, shrink_after=3)
+    source = Source(None, None, 100, 100, 100, 100, 100, 5000, 100, 100, 100)
+    for _ in range(2):
+        buffer.receive(source)
+    assert buffer.size == 16384
+
+    for _ in range(3):
+        buffer.receive(source)
+    assert buffer.size == 8192
+    # The memory is kept, so the next burst does not allocate again
+    assert buffer.capacity == 16384
+
+    # A larger read breaks the sequence of small reads
+    for _ in range(2):
+        buffer.receive(source)
+    buffer.receive(source)
+    assert buffer.size == 8192
+    for _ in range(3):
+        buffer.receive(source)
+    assert buffer.size == 4096
+
+
+def test_never_shrinks_below_the_minimum() -> None:
+    buffer = Buffer(size=4096, shrink_after=1)
+    source = Source(*[10] * 4)
+    for _ in range(4):
+        buffer.receive(source)
+    assert buffer.size == 4096
+
+
+def test_zero_maximum_is_unlimited() -> None:
+    buffer = Buffer(size=4096, maximum=0)
+    source = Source(*[None] * 8)
+    for _ in range(8):
+        buffer.receive(source)
+    assert buffer.size == 4096 * 2 ** 8
+    assert buffer.capacity == buffer.size
+
+
+def test_reset_is_the_end_of_the_connection() -> None:
+    buffer = Buffer()
+    assert len(buffer.receive(Reset())) == 0
+    assert buffer.size == 4096
@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+"""
+Round trip of the captures: the records written by Capture are read back by Recording, split in shards and the world is
+restored from the snapshots and the replay of the tail.
+"""
+from struct import pack
+
+from core.capture import Capture, Recording
+from core.parser import Parse
+
+RECORDS = 40
+START = 100.0
+STEP = 0.25
+
+
+def health(idx: int, value: int) -> bytes:
+    """
+    Build the package 0x2b2b with the health of an actor, followed by the two bytes of the end of the server data.
+    """
+    return b'\x2b\x2b' + pack('<Ii', idx, value) + b'\x00\x00'
+
+
+def write(filename: str) -> list:
+    """
+    Write the health of two actors in a capture with an index per second and a snapshot every two seconds.
+    """
+    capture = Capture(filename, index_interval=1.0, snapshot_interval=2.0)
+    written = []
+    for number in range(RECORDS):
+        timestamp = START + number * STEP
+        data = health(1 + number % 2, 1000 - number)
+        parse = Parse(data, live=False)
+        parse.time = timestamp
+        parse.server(3000)
+        capture.add(3000, True, timestamp, data, parse.events)
+        written.append((timestamp, 3000, True, data))
+    capture.close()
+    return written
+
+
+def test_records_are_read_back(tmp_path) -> None:
+    filename = str(tmp_path / 'session.cap')
+    written = write(filename)
+    recording = Recording(filename)
+    try:
+        records = recording.records()
+        assert [(timestamp, port, is_server, bytes(data)) for timestamp, port, is_server, data in records] == written
+
+        middle = [timestamp for timestamp, *_ in recording.records(start=START + 3.0, end=START + 5.0)]
+        assert middle == [timestamp for timestamp, *_ in written if START + 3.0 <= timestamp <= START + 5.0]
+    finally:
+        recording.close()
+
+
+def test_shards_cover_every_record_once(tmp_path) -> None:
+    filename = str(tmp_path / 'session.cap')
+    written = write(filename)
+    recording = Recording(filename)
+    try:
+        shards = recording.shards(2.0)
+        assert len(shards) > 1
+        assert all(end == first for (_, end), (first, _) in zip(shards, shards[1:]))
+
+        times = [timestamp for first, end in shards for timestamp, *_ in recording.records(offset=first, stop=end)]
+        assert times == [timestamp for timestamp, *_ in written]
+    finally:
+        recording.close()
+
+
+def test_world_at_restores_the_health(tmp_path) -> None:
+    filename = str(tmp_path / 'session.cap')
+    write(filename)
+    recording = Recording(filename)
+    try:
+        assert len(recording.snapshot_times) > 1
+        for number in (0, 7, 8, 21, RECORDS - 1):
+            world = recording.world_at(START + number * STEP)
+            assert world.time == START + number * STEP
+            assert world.entities[f'3000:{1 + number % 2}']['health'] == 1000 - number
+            if number:
+                assert world.entities[f'3000:{1 + (number - 1) % 2}']['health'] == 1000 - number + 1
+            else:
+                assert '3000:2' not in world.entities
+    finally:
+        recording.close()
@@ -0,0 +1,104 @@
+# -*- coding: UTF-8 -*-
+"""
+Token buckets of the pacing and the retries of the injector with a fake monotonic clock. The times are exact in binary,
+so the refill is compared without tolerance.
+"""
+from pytest import fixture
+
+import core.pacing
+from core.inject import Inject
+from core.pacing import Pacing
+
+LOOT = bytes.fromhex('656501000000')
+RELOAD = bytes.fromhex('726c')
+POSITION = Pacing.POSITION + bytes(range(20))
+
+
+class Clock:
+    """
+    Monotonic clock which only moves when the test advances it.
+    """
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@fixture
+def clock(monkeypatch) -> Clock:
+    fake = Clock()
+    monkeypatch.setattr(core.pacing, 'monotonic', fake)
+    monkeypatch.setattr(Pacing, 'RATES', {'loot': [4.0, 2], 'reload': [2.0, 1], 'other': [10.0, 5]})
+    return fake
+
+
+def test_burst_limit(clock) -> None:
+    pacing = Pacing(3000)
+    assert [pacing.allow('server', LOOT) for _ in range(3)] == [True, True, False]
+    # Every class has its own bucket
+    assert pacing.allow('server', RELOAD)
+    assert pacing.sent == {'loot': 2, 'reload': 1}
+
+
+def test_bucket_refill(clock) -> None:
+    pacing = Pacing(3000)
+    assert pacing.allow('server', LOOT) and pacing.allow('server', LOOT)
+    clock.now += 0.125
+    assert not pacing.allow('server', LOOT)
+    clock.now += 0.125
+    assert pacing.allow('server', LOOT)
+    # The bucket is never filled over the burst
+    clock.now += 60.0
+    assert [pacing.allow('server', LOOT) for _ in range(3)] == [True, True, False]
+
+
+def test_deferral_is_counted_once(clock) -> None:
+    pacing = Pacing(3000)
+    pacing.allow('server', LOOT)
+    pacing.allow('server', LOOT)
+    for _ in range(5):
+        assert not pacing.allow('server', LOOT)
+    assert pacing.deferred == {'loot': 1}
+    assert pacing.stats()['waiting'] == ['server:loot']
+
+    clock.now += 0.25
+    assert pacing.allow('server', LOOT)
+    assert pacing.stats()['waiting'] == []
+    assert pacing.delay == 0.25
+
+    assert not pacing.allow('server', LOOT)
+    assert pacing.deferred == {'loot': 2}
+
+
+def test_cadence_between_injections(clock, monkeypatch) -> None:
+    monkeypatch.setattr(Pacing, 'JITTER', 0.0)
+    pacing = Pacing(3000)
+    pacing.cadence = 0.5
+    assert pacing.allow('server', LOOT)
+    assert not pacing.allow('server', RELOAD)
+    # The interval is kept per destination
+    assert pacing.allow('client', RELOAD)
+    clock.now += 0.5
+    assert pacing.allow('server', RELOAD)
+
+
+def test_retry_is_spent_only_when_allowed(clock) -> None:
+    pacing = Pacing(3000)
+    inject = Inject(pacing)
+    inject.get_fire_balls(3)
+
+    data = inject.run(memoryview(POSITION), 'server')
+    assert data[:len(LOOT)] == LOOT and inject.retries == 2
+    inject.run(memoryview(POSITION), 'server')
+    assert inject.retries == 1
+
+    data = inject.run(memoryview(POSITION), 'server')
+    assert bytes(data) == POSITION and inject.retries == 1
+    inject.run(memoryview(POSITION), 'client')
+    assert inject.retries == 1 and pacing.deferred == {'loot': 1}
+
+    clock.now += 0.25
+    data = inject.run(memoryview(POSITION), 'server')
+    assert data[:len(LOOT)] == LOOT and inject.retries == 0
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+"""
+Regression tests of the structured events of the parser. The IDs of the packages are written as they are sent.
+"""
+from struct import pack
+
+from core.parser import Parse
+
+
+def spawn(idx: int, name: bytes) -> bytes:
+    """
+    Build the package 0x6d6b of a new actor.
+    """
+    return b'\x6d\x6b' + pack('<I4sbH', idx, b'\x00' * 4, 1, len(name)) + name + \
+        pack('<fff4s2sI', 1.0, 2.0, 3.0, b'\x00' * 4, b'\x00' * 2, 7)
+
+
+def test_spawn_followed_by_another_package() -> None:
+    data = spawn(42, b'DropBag') + b'\x2b\x2b' + pack('<Ii', 42, 100) + b'\x00\x00'
+    parse = Parse(data, live=False)
+    parse.server(3000)
+
+    assert parse.events == [
+        ('init', {'actor': 42, 'name': 'DropBag', 'type': 7, 'x': 1.0, 'y': 2.0, 'z': 3.0}),
+        ('health', {'actor': 42, 'health': 100}),
+    ]
+    assert [packet_id for packet_id, _ in parse.opcodes] == [0x6b6d, 0x2b2b]
+
+
+def test_named_client_packages() -> None:
+    quest = b'Until the Cows Come Home'
+    data = b'\x2a\x69' + pack('<H3sfff', 3, b'Gun', 1.0, 2.0, 3.0) + b'\x71\x3d' + pack('<H', len(quest)) + quest + \
+        b'\x6a\x70' + pack('<?', True)
+    parse = Parse(data, live=False)
+    parse.client(3000)
+
+    assert [event for event, _ in parse.events] == ['client_shoot', 'quest_selected', 'client_jump']
+    assert parse.events[1][1] == {'name': quest.decode('UTF-8')}
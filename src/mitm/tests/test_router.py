@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests of the routing table: the game servers learned from the master server and the least connections balance.
+"""
+from struct import pack
+
+from core.router import Router
+from core.upstream import Upstream
+
+
+def announce(host: bytes, port: int) -> bytes:
+    """
+    Build the address of a game server as the master server sends it.
+    """
+    return pack('<H', len(host)) + host + pack('<H', port)
+
+
+def router() -> tuple:
+    """
+    Create a router whose routes are recorded instead of opening the listeners.
+    """
+    table = Router('127.0.0.1', 3333, Upstream())
+    added = []
+    table.add = lambda host, port, start=True: added.append((host, port))
+    return table, added
+
+
+def test_learn_the_announced_servers() -> None:
+    table, added = router()
+    table.learn(b'\x01\x02\x03' + announce(b'game1.pwn3', 3002) + b'\xff' + announce(b'10.0.0.7', 3005) + b'\x00\x00')
+    assert added == [('game1.pwn3', 3002), ('10.0.0.7', 3005)]
+
+
+def test_learn_ignores_invalid_addresses() -> None:
+    table, added = router()
+    table.learn(announce(b'game1.pwn3', 4000) + announce(b'no-dots', 3001) + announce(b'bad host.pwn3', 3001) +
+                announce(b'.pwn3', 3001))
+    assert added == []
+
+
+def test_learn_ignores_truncated_addresses() -> None:
+    table, added = router()
+    table.learn(announce(b'game1.pwn3', 3002)[:-1])
+    assert added == []
+
+
+def test_select_balances_the_least_connections() -> None:
+    table, _ = router()
+    table.routes[3001] = {'10.0.0.1': 0, '10.0.0.2': 0}
+    hosts = [table.select(3001) for _ in range(4)]
+    assert sorted(hosts) == ['10.0.0.1', '10.0.0.1', '10.0.0.2', '10.0.0.2']
+    assert table.routes[3001] == {'10.0.0.1': 2, '10.0.0.2': 2}
+
+    table.release('10.0.0.2', 3001)
+    table.release('10.0.0.2', 3001)
+    assert table.select(3001) == '10.0.0.2'
+    assert table.routes[3001] == {'10.0.0.1': 2, '10.0.0.2': 1}
+
+
+def test_release_does_not_count_below_zero() -> None:
+    table, _ = router()
+    table.routes[3001] = {'10.0.0.1': 0}
+    table.release('10.0.0.1', 3001)
+    table.release('10.0.0.9', 3001)
+    table.release('10.0.0.1', 3009)
+    assert table.routes == {3001: {'10.0.0.1': 0}}